@@ -12,6 +12,7 @@ from dotenv import load_dotenv
 
 from backend.config import Config
 from backend.extensions import init_extensions, db, login_manager  # single shared SQLAlchemy/Migrate/JWT instances
+from backend.utils.json_response import OrjsonProvider, orjson
 
 # ===== Blueprints =====
 from backend.routes.auth_routes import auth_bp
@@ -371,6 +372,8 @@ def create_app() -> Flask:
         static_url_path="/_static",
     )
     app.config.from_object(Config)
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
 
     # Normalize SQLite path BEFORE init db
     _normalize_sqlite_uri(app)
@@ -48,6 +48,11 @@ class Config:
     SESSION_COOKIE_SAMESITE = os.getenv("SESSION_COOKIE_SAMESITE", "Lax")  # use "None" for true cross-site
     SESSION_COOKIE_SECURE = os.getenv("SESSION_COOKIE_SECURE", "False").lower() == "true"
 
+    # ── Shared cache (Flask-Caching); Redis lets all gunicorn workers share entries ──
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL") or os.getenv("REDIS_URL")
+    CACHE_TYPE = os.getenv("CACHE_TYPE", "RedisCache" if CACHE_REDIS_URL else "SimpleCache")
+    CACHE_DEFAULT_TIMEOUT = 300
+
     # ── CORS (set your frontend origins here) ──────────────────────────────────
     CORS_ALLOWED_ORIGINS = [
         o.strip() for o in os.getenv("CORS_ALLOWED_ORIGINS", "http://localhost:5173").split(",")
@@ -56,4 +61,7 @@ class Config:
     CORS_SUPPORTS_CREDENTIALS = True
     
     #file upload
-    UPLOAD_ROOT = os.environ.get("UPLOAD_ROOT") or os.path.join(os.path.dirname(__file__), "uploads")
\ No newline at end of file
+    UPLOAD_ROOT = os.environ.get("UPLOAD_ROOT") or os.path.join(os.path.dirname(__file__), "uploads")
+    # send_file already hands file bodies to wsgi.file_wrapper (sendfile(2) under gunicorn);
+    # set this when a front-end server honours X-Sendfile so it serves the bytes instead
+    USE_X_SENDFILE = os.getenv("USE_X_SENDFILE", "False").lower() == "true"
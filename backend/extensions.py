@@ -11,6 +11,11 @@ from flask_login import LoginManager
 # backend/extensions.py
 from flask_login import LoginManager
 
+try:
+    from flask_caching import Cache  # type: ignore
+except Exception:  # pragma: no cover
+    Cache = None
+
 # Extensions
 
 db = SQLAlchemy()
@@ -21,6 +26,9 @@ jwt = JWTManager()
 fernet = Fernet(os.getenv("ENCRYPTION_KEY", Fernet.generate_key()))
 
 
+# Cross-worker cache (RedisCache when CACHE_REDIS_URL is set, else per-process SimpleCache)
+cache = Cache() if Cache is not None else None
+
 login_manager = LoginManager()
 login_manager.session_protection = "strong"
 login_manager.login_view = None
@@ -29,6 +37,8 @@ def init_extensions(app: Flask):
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
+    if cache is not None:
+        cache.init_app(app)
     CORS(app, resources={r"/*": {"origins": "http://localhost:5001"}}, supports_credentials=True)
 
     # 🔐 attach Flask-Login to this app (this was missing)
@@ -4,6 +4,7 @@ import json
 from datetime import datetime, timedelta, date
 
 from sqlalchemy import UniqueConstraint
+from sqlalchemy.orm import validates
 from sqlalchemy.sql import func
 from backend.extensions import db
 
@@ -23,6 +24,11 @@ class User(db.Model, UserMixin):  # <-- inherit UserMixin
 
     password = db.Column(db.String(200), nullable=False)
 
+    # login / invite-accept look users up by lower(email); username is covered by its unique index
+    __table_args__ = (
+        db.Index("ix_user_email_lower", func.lower(email)),
+    )
+
     user_type         = db.Column(db.String(50), nullable=False)
     organization_name = db.Column(db.String(150), nullable=True)
 
@@ -75,6 +81,27 @@ class Invitation(db.Model):
     expires_at = db.Column(db.DateTime, nullable=False)
     used_at    = db.Column(db.DateTime, nullable=True)
 
+    # list_invitations orders/seeks on (sort column, id) in one direction, NULLs last.
+    # The plain (col, id) btrees serve ascending order (Postgres' default ASC NULLS LAST).
+    # A backward scan of those would give DESC NULLS FIRST, so the default descending
+    # listing gets its own Postgres-only (col DESC NULLS LAST, id DESC) indexes. On Postgres
+    # the listing columns are INCLUDEd so a page can be served from the index alone.
+    __table_args__ = (
+        db.Index("ix_invitations_used_at_id", "used_at", "id",
+                 postgresql_include=["status", "name", "email"]),
+        db.Index("ix_invitations_created_at_id", "created_at", "id",
+                 postgresql_include=["status", "name", "email"]),
+        db.Index("ix_invitations_used_at_desc_id", used_at.desc().nullslast(), id.desc(),
+                 postgresql_include=["status", "name", "email"]).ddl_if(dialect="postgresql"),
+        db.Index("ix_invitations_created_at_desc_id", created_at.desc().nullslast(), id.desc(),
+                 postgresql_include=["status", "name", "email"]).ddl_if(dialect="postgresql"),
+    )
+
+    @validates("status")
+    def _normalize_status(self, key, value):
+        # stored lowercase so filters can use plain equality (and the indexes above)
+        return value.strip().lower() if isinstance(value, str) else value
+
     def is_valid(self) -> bool:
         return self.status == "pending" and (self.expires_at is None or self.expires_at >= datetime.utcnow())
 
@@ -125,7 +152,8 @@ class Investor(db.Model):
     account_user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
     account_user    = db.relationship("User", foreign_keys=[account_user_id], lazy=True)
 
-    invitation_id = db.Column(db.Integer, db.ForeignKey("invitations.id"), nullable=True)
+    # unique: accept_invite upserts the investor on this key
+    invitation_id = db.Column(db.Integer, db.ForeignKey("invitations.id"), nullable=True, unique=True)
     invitation    = db.relationship("Invitation", foreign_keys=[invitation_id], lazy=True)
 
     # new granular profile fields
@@ -291,6 +319,10 @@ class Record(db.Model):
     source = db.Column(db.String(50))   # manual, sheet
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_record_investor_type", "investor_id", "type"),
+    )
+
 
 # ------------------ Admin Settings (QuickBooks; legacy/global) ------------------
 class AdminSettings(db.Model):
@@ -394,6 +426,12 @@ class FileNode(db.Model):
     parent_id= db.Column(db.Integer, db.ForeignKey("file_nodes.id"), nullable=True)
     path     = db.Column(db.Text, nullable=False)
     permission= db.Column(db.String(50), default="Investor")
+    # content checksum/size/mtime recorded at upload; zip downloads reuse the checksum only while
+    # the file on disk still has that size and mtime
+    crc32    = db.Column(db.BigInteger, nullable=True)
+    size     = db.Column(db.BigInteger, nullable=True)
+    mtime_ns = db.Column(db.BigInteger, nullable=True)
+    mime_type= db.Column(db.String(127), nullable=True)  # guessed from the name at upload/rename
     created_at= db.Column(db.DateTime, default=datetime.utcnow)
     updated_at= db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -649,6 +687,7 @@ class Document(db.Model):
     stored_name = db.Column(db.String(255), nullable=False, unique=True)
     mime_type = db.Column(db.String(128))
     size_bytes = db.Column(db.Integer)
+    content_sha256 = db.Column(db.String(64), index=True)  # hex digest; doubles as a strong ETag
     # NOTE: FK points to 'user.id' (singular), matching the User table name
     uploaded_by_user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -665,6 +704,9 @@ class DocumentShare(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint("document_id", "investor_user_id", name="uq_doc_investor"),
+        # investor-side listing filters on investor_user_id first; the unique
+        # constraint above already covers (document_id, investor_user_id) probes
+        db.Index("ix_docshare_inv_doc", "investor_user_id", "document_id"),
     )
 
 
@@ -690,7 +732,10 @@ class Statement(db.Model):
     roi_pct           = db.Column(db.Numeric(9,4), nullable=True)   # e.g., -0.709%
     pdf_path          = db.Column(db.String(512), nullable=True)     # saved PDF
     created_at        = db.Column(db.DateTime, server_default=db.func.now())
-    __table_args__ = (db.UniqueConstraint('investor_id','period_start','period_end', name='uix_statement_quarter'),)
+    __table_args__ = (
+        db.UniqueConstraint('investor_id','period_start','period_end', name='uix_statement_quarter'),
+        db.Index('ix_statement_investor_created', 'investor_id', 'created_at', 'period_end'),
+    )
 
 
 
@@ -711,3 +756,15 @@ class InvestorAccreditation(db.Model):
     updated_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
     investor = db.relationship("Investor", backref=db.backref("accreditation", uselist=False, cascade="all, delete"))
+
+
+# --- Q4 report rows (ingested from the bcas_q4_adj sheet; one row per "Name Match") ---
+class Q4ReportRow(db.Model):
+    __tablename__ = "q4_report_rows"
+
+    name_match     = db.Column(db.String(255), primary_key=True)   # stripped + lowercased
+    ending_balance = db.Column(db.Float, nullable=True)
+    unrealized     = db.Column(db.Float, nullable=True)
+    mgmt_fee       = db.Column(db.Float, nullable=True)
+    committed      = db.Column(db.Float, nullable=True)
+    source_mtime   = db.Column(db.BigInteger, nullable=False)      # st_mtime_ns of the workbook ingested
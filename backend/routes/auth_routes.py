@@ -8,11 +8,12 @@ from typing import Optional, Dict, Any
 from flask import (
     Blueprint, jsonify, request, session, current_app, make_response
 )
-from werkzeug.security import check_password_hash
 from flask_login import login_user, logout_user, current_user  # <-- Flask-Login
+from sqlalchemy import func
 
 from backend.models import User, Investor
-from backend.extensions import db  # noqa: F401
+from backend.extensions import db
+from backend.utils.passwords import verify_password
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
 
@@ -26,7 +27,7 @@ def _find_user_by_identifier(identifier: str) -> Optional[User]:
     if not ident:
         return None
 
-    user = User.query.filter(User.email.ilike(ident)).first()
+    user = User.query.filter(func.lower(User.email) == ident).first()
     if user:
         return user
 
@@ -167,9 +168,18 @@ def login():
         return jsonify({"ok": False, "error": "Invalid email/username or password"}), 401
 
     hashed = getattr(user, "password_hash", None) or getattr(user, "password", None)
-    if not hashed or not check_password_hash(hashed, password):
+    ok, rehashed = verify_password(hashed, password)
+    if not ok:
         return jsonify({"ok": False, "error": "Invalid email/username or password"}), 401
 
+    # Transparently migrate legacy PBKDF2 hashes to argon2id on successful login
+    if rehashed:
+        try:
+            user.password = rehashed
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+
     login_user(user, remember=False)
 
     # DO NOT clear the session now—Flask-Login stored _user_id there.
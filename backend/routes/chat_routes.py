@@ -5,7 +5,7 @@ import os, re, json, uuid, difflib
 from datetime import datetime
 from typing import Any, Dict, Optional, List, Tuple
 
-from flask import Blueprint, request, jsonify, url_for
+from flask import Blueprint, request, jsonify, url_for, current_app
 from flask_login import current_user, login_required
 
 from backend.extensions import db
@@ -50,6 +50,25 @@ if not UPLOAD_ROOTS:
         os.path.abspath("./backend/uploads"),
     ]
 
+@chat_bp.record_once
+def _freeze_chat_defaults(state) -> None:
+    """
+    Resolve the upload search roots once at registration (absolute, deduped),
+    so request handlers never re-normalize paths. The documents blueprint's
+    upload dir goes first: stored_name then hits with a single isfile().
+    """
+    app = state.app
+    docs_dir = os.getenv("UPLOAD_DOCS_DIR", os.path.join(app.root_path, "uploads", "docs"))
+    roots = [
+        os.path.normpath(os.path.abspath(os.path.expanduser(os.path.expandvars(r.strip()))))
+        for r in [docs_dir, *UPLOAD_ROOTS] if r and r.strip()
+    ]
+    app.extensions["chat_defaults"] = {"upload_roots": tuple(dict.fromkeys(roots))}
+
+def _upload_roots():
+    defaults = current_app.extensions.get("chat_defaults") or {}
+    return defaults.get("upload_roots") or UPLOAD_ROOTS
+
 def _dprint(*args):
     if CHAT_DEBUG:
         print("[chat]", *args)
@@ -417,16 +436,19 @@ def _extract_file_query(message: str) -> str:
     return low
 
 def _find_on_disk(stored_name: str, original_name: Optional[str]) -> Optional[str]:
-    candidates = [stored_name] + ([original_name] if original_name else [])
-    for root in UPLOAD_ROOTS:
+    for root in _upload_roots():
         try:
             direct = os.path.join(root, stored_name)
             if os.path.isfile(direct): return os.path.abspath(direct)
-            for cand in candidates:
-                if not cand: continue
-                for dirpath, _dirnames, filenames in os.walk(root):
-                    if cand in filenames:
-                        return os.path.abspath(os.path.join(dirpath, cand))
+            # one sweep per root: stored_name wins, original_name is the fallback
+            fallback = None
+            for dirpath, _dirnames, filenames in os.walk(root):
+                if stored_name and stored_name in filenames:
+                    return os.path.abspath(os.path.join(dirpath, stored_name))
+                if fallback is None and original_name and original_name in filenames:
+                    fallback = os.path.abspath(os.path.join(dirpath, original_name))
+            if fallback:
+                return fallback
         except Exception:
             continue
     return None
@@ -622,6 +644,20 @@ def handle_general_intent(message: str) -> Dict[str, Any]:
     return {"answer": _ask_llm(sys, {"flow":"general"}, message), "context": {"flow":"general"}}
 
 # =================== Intent Detection ===================
+# Any word that could route to balance/file/calculation flows. Short messages
+# with none of these are plain chit-chat and skip the LLM classifier call.
+_INTENT_HINT_RE = re.compile(
+    r"\b("
+    r"balances?|nav|valu(e|es|ation|ations)|worth|fees?|unreali[sz]ed|reali[sz]ed|gains?|loss(es)?|p&l|profit"
+    r"|returns?|roi|irr|xirr|moic|multiple|contribut\w*|distribut\w*|capital|invest\w*|portfolio|performance"
+    r"|growth|yield|dividends?|aum|ebitda|revenue|cash\s*flow|allocation|exposure"
+    r"|total|amount|how\s+much|money|earn\w*|holdings?|equity|commit\w*|account"
+    r"|files?|docs?|documents?|pdfs?|statements?|reports?|k-?1s?|download\w*|xlsx?|csv|spreadsheets?"
+    r")\b",
+    re.I,
+)
+_PREFILTER_MAX_LEN = 200
+
 def detect_intent(message: str) -> Dict[str, Any]:
     system = (
         "Classify the user's message into one of four intents: "
@@ -656,7 +692,10 @@ def chat():
     user = _get_user_safe()
     _append_turn(tenant, conversation_id, "user", message)
 
-    intent = detect_intent(message)
+    if len(message) < _PREFILTER_MAX_LEN and not _INTENT_HINT_RE.search(message):
+        intent = {"type": "general", "entities": {}}
+    else:
+        intent = detect_intent(message)
     itype = intent["type"]
 
     if itype == "balance_data":
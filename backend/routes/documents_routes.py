@@ -1,10 +1,15 @@
 # backend/routes/documents_routes.py
 import os, mimetypes, json, time, hmac, hashlib, base64
+from datetime import datetime
 from flask import (
     Blueprint, request, jsonify, current_app,
-    send_from_directory, send_file, url_for, abort
+    send_from_directory, send_file, url_for, abort, g
 )
 from werkzeug.utils import secure_filename
+from sqlalchemy import literal, and_, or_
+from sqlalchemy.orm import selectinload
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from flask_login import login_required, current_user
 
 from backend.extensions import db
@@ -15,27 +20,51 @@ documents_bp = Blueprint("documents", __name__)
 # ─────────────────────────────────────────────────────────────
 # Helpers
 # ─────────────────────────────────────────────────────────────
+_UPLOAD_DIR: str | None = None
+_UPLOAD_DIR_BYTES: bytes | None = None  # pre-encoded for direct stat/unlink syscalls
+
 def _ensure_upload_dir():
-    upload_dir = os.getenv(
-        "UPLOAD_DOCS_DIR",
-        os.path.join(current_app.root_path, "uploads", "docs"),
-    )
-    os.makedirs(upload_dir, exist_ok=True)
-    return upload_dir
+    global _UPLOAD_DIR, _UPLOAD_DIR_BYTES
+    if _UPLOAD_DIR is None:
+        upload_dir = os.getenv(
+            "UPLOAD_DOCS_DIR",
+            os.path.join(current_app.root_path, "uploads", "docs"),
+        )
+        os.makedirs(upload_dir, exist_ok=True)
+        _UPLOAD_DIR, _UPLOAD_DIR_BYTES = upload_dir, os.fsencode(upload_dir)
+    return _UPLOAD_DIR
+
+def _stored_path_bytes(stored_name: str) -> bytes:
+    _ensure_upload_dir()
+    return os.path.join(_UPLOAD_DIR_BYTES, os.fsencode(stored_name or ""))
+
+def _auth_ctx() -> dict:
+    """
+    Resolve the caller's admin flag and user id once per request.
+    Every route asks for these (often more than once), and each access goes
+    through the current_user proxy, so memoize them on flask.g.
+    """
+    ctx = getattr(g, "_documents_auth_ctx", None)
+    if ctx is None:
+        user = current_user._get_current_object()
+        authed = bool(getattr(user, "is_authenticated", False))
+        uid = None
+        if authed and getattr(user, "id", None) is not None:
+            try:
+                uid = int(user.id)
+            except Exception:
+                uid = user.id
+        ctx = g._documents_auth_ctx = {
+            "is_admin": authed and str(getattr(user, "user_type", "")).lower() == "admin",
+            "uid": uid,
+        }
+    return ctx
 
 def _is_admin() -> bool:
-    return bool(
-        getattr(current_user, "is_authenticated", False)
-        and str(getattr(current_user, "user_type", "")).lower() == "admin"
-    )
+    return _auth_ctx()["is_admin"]
 
 def _authed_user_id():
-    if getattr(current_user, "is_authenticated", False) and getattr(current_user, "id", None) is not None:
-        try:
-            return int(current_user.id)
-        except Exception:
-            return current_user.id
-    return None
+    return _auth_ctx()["uid"]
 
 def _is_admin_or_shared(doc_id: int) -> bool:
     if _is_admin():
@@ -43,13 +72,32 @@ def _is_admin_or_shared(doc_id: int) -> bool:
     uid = _authed_user_id()
     if not uid:
         return False
+    # select a constant so the probe is answered from uq_doc_investor alone
     return (
-        db.session.query(DocumentShare.id)
-        .filter_by(document_id=doc_id, investor_user_id=uid)
+        db.session.query(literal(1))
+        .filter(DocumentShare.document_id == doc_id, DocumentShare.investor_user_id == uid)
         .first()
         is not None
     )
 
+def _dialect_insert():
+    name = (db.engine.name or "").lower()
+    return pg_insert if "postgre" in name else sqlite_insert
+
+def _add_shares(doc_id: int, user_ids) -> None:
+    """One INSERT for all shares; pairs already present are skipped by uq_doc_investor."""
+    now = datetime.utcnow()
+    rows = [
+        {"document_id": int(doc_id), "investor_user_id": int(u), "shared_at": now}
+        for u in dict.fromkeys(user_ids)
+    ]
+    if not rows:
+        return
+    stmt = _dialect_insert()(DocumentShare).values(rows).on_conflict_do_nothing(
+        index_elements=["document_id", "investor_user_id"]
+    )
+    db.session.execute(stmt)
+
 def _to_int_list(values):
     """Coerce a string/array of ids into a list of ints."""
     if values is None:
@@ -157,6 +205,24 @@ def _unique_filename(directory: str, requested_name: str) -> str:
         counter += 1
     return candidate
 
+def _save_stream_hashed(file_storage, path: str, chunk_size: int = 1024 * 1024):
+    """
+    Copy the upload to `path` in chunks, hashing as we go.
+    Returns (size_bytes, sha256_hex) so no second read of the file is needed.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    stream = file_storage.stream
+    with open(path, "wb") as out:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
+
 # ─────────────────────────────────────────────────────────────
 # HMAC preview signing (short-lived public links)
 # ─────────────────────────────────────────────────────────────
@@ -300,8 +366,7 @@ def upload_document():
 
     mime = file.mimetype or mimetypes.guess_type(original)[0] or "application/octet-stream"
     path = os.path.join(upload_dir, stored)
-    file.save(path)
-    size = os.path.getsize(path)
+    size, sha256 = _save_stream_hashed(file, path)
 
     doc = Document(
         title=title or os.path.splitext(original)[0],
@@ -309,35 +374,86 @@ def upload_document():
         stored_name=stored,         # on-disk name (original or "original (n).ext")
         mime_type=mime,
         size_bytes=size,
+        content_sha256=sha256,
         uploaded_by_user_id=int(_authed_user_id() or 0),
     )
     db.session.add(doc)
     db.session.flush()
 
-    for uid in resolved_user_ids:
-        db.session.add(DocumentShare(document_id=doc.id, investor_user_id=int(uid)))
-
+    _add_shares(doc.id, resolved_user_ids)
     db.session.commit()
     return jsonify(ok=True, document=_serialize(doc))
 
 # ─────────────────────────────────────────────────────────────
 # List documents
 # ─────────────────────────────────────────────────────────────
+def _encode_cursor(uploaded_at, doc_id: int) -> str:
+    raw = json.dumps([uploaded_at.isoformat() if uploaded_at else None, int(doc_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str):
+    """(uploaded_at or None, id) from _encode_cursor; raises ValueError on garbage."""
+    try:
+        val, doc_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return (datetime.fromisoformat(val) if val else None), int(doc_id)
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+
+def _after_cursor(cur_at, cur_id: int):
+    """Rows strictly after (cur_at, cur_id) in `uploaded_at DESC NULLS LAST, id DESC` order."""
+    id_after = Document.id < cur_id
+    if cur_at is None:  # already inside the trailing NULL block
+        return and_(Document.uploaded_at.is_(None), id_after)
+    return or_(
+        Document.uploaded_at < cur_at,
+        and_(Document.uploaded_at == cur_at, id_after),
+        Document.uploaded_at.is_(None),
+    )
+
 @documents_bp.get("/api/documents")
 @login_required
 def list_documents():
+    """
+    Newest first. Admins may page with ?limit=N[&cursor=<next_cursor>]; the response
+    then carries `next_cursor` (an opaque (uploaded_at, id) keyset) while more rows remain.
+    Without those params the full list is returned (current UI behaviour).
+    """
     if _is_admin():
-        docs = Document.query.order_by(Document.uploaded_at.desc()).all()
-    else:
-        uid = _authed_user_id()
-        if uid is None:
-            return jsonify(ok=True, documents=[])
-        docs = (
-            Document.query.join(DocumentShare)
-            .filter(DocumentShare.investor_user_id == uid)
-            .order_by(Document.uploaded_at.desc())
-            .all()
+        q = Document.query.options(selectinload(Document.shares)).order_by(
+            Document.uploaded_at.desc().nullslast(), Document.id.desc()
         )
+        cursor_s = (request.args.get("cursor") or "").strip()
+        limit_s = (request.args.get("limit") or "").strip()
+        if not (cursor_s or limit_s):
+            return jsonify(ok=True, documents=[_serialize(d) for d in q.all()])
+
+        if cursor_s:
+            try:
+                cur_at, cur_id = _decode_cursor(cursor_s)
+            except ValueError:
+                return jsonify(error="Invalid 'cursor'."), 400
+            q = q.filter(_after_cursor(cur_at, cur_id))
+        try:
+            limit = max(min(int(limit_s or 50), 500), 1)
+        except ValueError:
+            return jsonify(error="Invalid 'limit'."), 400
+
+        docs = q.limit(limit + 1).all()
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+        next_cursor = _encode_cursor(docs[-1].uploaded_at, docs[-1].id) if has_more else None
+        return jsonify(ok=True, documents=[_serialize(d) for d in docs], next_cursor=next_cursor)
+
+    uid = _authed_user_id()
+    if uid is None:
+        return jsonify(ok=True, documents=[])
+    docs = (
+        Document.query.join(DocumentShare)
+        .options(selectinload(Document.shares))
+        .filter(DocumentShare.investor_user_id == uid)
+        .order_by(Document.uploaded_at.desc())
+        .all()
+    )
     return jsonify(ok=True, documents=[_serialize(d) for d in docs])
 
 # ─────────────────────────────────────────────────────────────
@@ -361,10 +477,7 @@ def share_document():
     if not doc:
         return jsonify(error="Document not found."), 404
 
-    existing = {s.investor_user_id for s in doc.shares}
-    for uid in resolved_user_ids:
-        if int(uid) not in existing:
-            db.session.add(DocumentShare(document_id=doc.id, investor_user_id=int(uid)))
+    _add_shares(doc.id, resolved_user_ids)
     db.session.commit()
     return jsonify(ok=True, document=_serialize(doc))
 
@@ -415,9 +528,23 @@ def view_document(doc_id: int):
         return jsonify(error="Not found."), 404
     upload_dir = _ensure_upload_dir()
     path = os.path.join(upload_dir, doc.stored_name)
-    if not os.path.exists(path):
+    # send_file stats the file itself; a missing file surfaces as FileNotFoundError
+    try:
+        resp = send_file(
+            path,
+            mimetype=doc.mime_type or "application/octet-stream",
+            conditional=True,
+            etag=doc.content_sha256 or str(doc.id),
+            last_modified=doc.uploaded_at,
+        )
+    except FileNotFoundError:
         return jsonify(error="File missing on server."), 404
-    return send_file(path, mimetype=doc.mime_type or "application/octet-stream")
+    # per-user content: never stored by shared caches, and clients revalidate every time
+    # (a 304 against the ETag) so a revoked share takes effect immediately
+    resp.cache_control.public = False
+    resp.cache_control.private = True
+    resp.cache_control.no_cache = True
+    return resp
 
 # ─────────────────────────────────────────────────────────────
 # Signed preview URL (for cloud viewers)
@@ -438,23 +565,33 @@ def public_download_document(doc_id: int):
     if not _validate_sig(base_no_query, exp, sig):
         return abort(403)
 
-    doc = Document.query.get(doc_id)
+    # plain column tuple: no ORM identity-map work for an unauthenticated hot path
+    doc = (
+        db.session.query(
+            Document.stored_name,
+            Document.mime_type,
+            Document.original_name,
+            Document.uploaded_at,
+            Document.content_sha256,
+        )
+        .filter(Document.id == doc_id)
+        .first()
+    )
     if not doc:
         return jsonify(error="Not found."), 404
 
     upload_dir = _ensure_upload_dir()
-    path = os.path.join(upload_dir, doc.stored_name or "")
-    if not os.path.exists(path):
+    if not os.path.exists(_stored_path_bytes(doc.stored_name)):
         return jsonify(error="File missing on server."), 404
 
     return send_file(
-        path,
+        os.path.join(upload_dir, doc.stored_name),
         mimetype=doc.mime_type or "application/octet-stream",
         as_attachment=False,
         download_name=doc.original_name,
         max_age=_preview_ttl(),
         conditional=True,
-        etag=True,
+        etag=doc.content_sha256 or True,   # legacy rows fall back to Werkzeug's mtime etag
         last_modified=doc.uploaded_at,
     )
 
@@ -470,8 +607,7 @@ def delete_document(doc_id: int):
     if not doc:
         return jsonify(error="Not found."), 404
 
-    upload_dir = _ensure_upload_dir()
-    path = os.path.join(upload_dir, doc.stored_name or "")
+    path = _stored_path_bytes(doc.stored_name)
     try:
         if os.path.exists(path):
             os.remove(path)
@@ -3,7 +3,8 @@ from __future__ import annotations
 
 from flask import Blueprint, request, jsonify
 from werkzeug.utils import secure_filename
-import os, math, traceback
+import os, math, traceback, tempfile
+from itertools import islice
 from datetime import datetime, timedelta, date
 from calendar import monthrange
 from typing import Dict, Any, List, Tuple, Optional
@@ -33,6 +34,18 @@ try:
 except Exception:
     DataSource = None  # pragma: no cover
 
+# Optional Rust-backed XLSX/XLSM/XLS reader; several times faster than openpyxl
+try:
+    from python_calamine import CalamineWorkbook  # type: ignore
+except Exception:
+    CalamineWorkbook = None  # pragma: no cover
+
+# Optional C-level float parser (no exception per bad cell)
+try:
+    from fastnumbers import try_float as _try_float  # type: ignore
+except Exception:
+    _try_float = None  # pragma: no cover
+
 # Optional current_user (if your app uses flask-login)
 try:
     from flask_login import current_user  # type: ignore
@@ -43,6 +56,7 @@ excel_bp = Blueprint("excel_bp", __name__, url_prefix="/excel")
 
 UPLOAD_FOLDER = os.path.join(os.getcwd(), "uploads")
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+_UPLOAD_SPOOL_MAX = 100 * 1024 * 1024  # uploads above this spill from memory to a temp file
 
 DATE_COL = "as_of_date"
 
@@ -52,73 +66,179 @@ def _dialect_insert():
     name = (db.engine.name or "").lower()
     return pg_insert if "postgre" in name else sqlite_insert
 
+_NAN = math.nan
+_DASHES = frozenset({"—", "-", "–"})
+
 def _to_float_cell(v) -> float:
-    if v is None or v == "" or str(v).strip() in {"—", "-", "–"}:
-        return math.nan
-    s = str(v).strip().replace(",", "").replace("$", "")
+    if v is None or isinstance(v, bool):
+        return _NAN
+    if isinstance(v, (int, float)):
+        return float(v)  # already numeric: no str round-trip
+    s = v.strip() if isinstance(v, str) else str(v).strip()
+    if not s or s in _DASHES:
+        return _NAN
+    if "," in s or "$" in s:
+        s = s.replace(",", "").replace("$", "")
     if s.startswith("(") and s.endswith(")"):
         s = "-" + s[1:-1]
+    if _try_float is not None:
+        return _try_float(s, on_fail=_NAN, allow_underscores=True)
     try:
         return float(s)
     except Exception:
-        return math.nan
+        return _NAN
+
+_DATE_FORMATS = (
+    "%m/%d/%Y", "%Y-%m-%d", "%d/%m/%Y", "%m/%d/%y", "%d-%b-%Y",
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%d-%b-%y",
+    "%b-%y", "%b %y", "%b-%Y", "%b %Y"
+)
+# strptime's %b only accepts these abbreviations; anything else can't start a date string
+_MONTH_ABBR = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+_EXCEL_EPOCH = datetime(1899, 12, 30)
 
 def _candidate_date_formats():
-    return (
-        "%m/%d/%Y", "%Y-%m-%d", "%d/%m/%Y", "%m/%d/%y", "%d-%b-%Y",
-        "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%d-%b-%y",
-        "%b-%y", "%b %y", "%b-%Y", "%b %Y"
-    )
+    return _DATE_FORMATS
 
 def _maybe_excel_serial(v) -> Optional[date]:
     try:
         fv = float(v)
         if 20000 < fv < 90000:
-            base = datetime(1899, 12, 30)
-            return (base + timedelta(days=int(fv))).date()
+            return (_EXCEL_EPOCH + timedelta(days=int(fv))).date()
     except Exception:
         pass
     return None
 
-def _looks_like_date(v) -> bool:
-    if isinstance(v, (datetime, date)):
-        return True
-    if _maybe_excel_serial(v):
-        return True
-    s = str(v).strip().rstrip("Z")
-    for fmt in _candidate_date_formats():
-        try:
-            datetime.strptime(s, fmt)
-            return True
-        except Exception:
-            continue
-    return False
+def _yy(y2: str) -> int:
+    yy = int(y2)  # strptime %y pivot: 69-99 -> 1900s, 00-68 -> 2000s
+    return 1900 + yy if yy >= 69 else 2000 + yy
+
+def _fast_date_str(s: str):
+    """
+    Hand-rolled parse for the shapes seen in practice: M/D/Y (then D/M/Y),
+    M/D/YY, D-Mon-Y[Y], Mon-Y[Y] / Mon Y[Y]. Mirrors strptime's digit-width rules.
+    Returns a date, None (recognized shape but invalid), or ... (not handled here).
+    """
+    try:
+        if "/" in s:
+            a, b, y = s.split("/")
+            if not (a.isdigit() and b.isdigit() and y.isdigit() and len(a) <= 2 and len(b) <= 2):
+                return None
+            if len(y) == 4:
+                try:
+                    return date(int(y), int(a), int(b))
+                except ValueError:
+                    return date(int(y), int(b), int(a))
+            if len(y) == 2:
+                return date(_yy(y), int(a), int(b))
+            return None
+        mon = _MONTH_ABBR.get(s[:3].lower())
+        if mon and len(s) > 4 and (s[3] == "-" or s[3].isspace()):
+            y = s[4:].lstrip() if s[3].isspace() else s[4:]
+            if y.isdigit() and len(y) in (2, 4):
+                return date(_yy(y) if len(y) == 2 else int(y), mon, 1)
+            return ...
+        if s[0].isdigit() and s.count("-") == 2:
+            d, m, y = s.split("-")
+            mon = _MONTH_ABBR.get(m.lower()) if len(m) == 3 else None
+            if mon and d.isdigit() and len(d) <= 2 and y.isdigit() and len(y) in (2, 4):
+                return date(_yy(y) if len(y) == 2 else int(y), mon, int(d))
+    except ValueError:
+        return None
+    return ...
 
 def _parse_date_any(v) -> Optional[date]:
+    """
+    Single-pass date detection + parse. Dispatches on type first so numeric and
+    label cells never reach strptime; strings that cannot start a supported
+    format (digit or month abbreviation) are rejected without trying any.
+    """
+    if v is None or isinstance(v, bool):
+        return None
     if isinstance(v, datetime):
         return v.date()
     if isinstance(v, date):
         return v
-    ser = _maybe_excel_serial(v)
-    if ser:
-        return ser
+    if isinstance(v, (int, float)):
+        if 20000 < v < 90000:
+            return (_EXCEL_EPOCH + timedelta(days=int(v))).date()
+        return None
     s = str(v).strip().rstrip("Z")
-    for fmt in _candidate_date_formats():
+    if not s:
+        return None
+    if s[0].isdigit():
+        ser = _maybe_excel_serial(s)
+        if ser:
+            return ser
+        if len(s) >= 10 and s[4] == "-" and s[7] == "-":
+            try:
+                return datetime.fromisoformat(s).date()
+            except ValueError:
+                pass
+    elif s[:3].lower() not in _MONTH_ABBR:
+        return None
+    fast = _fast_date_str(s)
+    if fast is not ...:
+        return fast
+    for fmt in _DATE_FORMATS:
         try:
             return datetime.strptime(s, fmt).date()
         except Exception:
             continue
     return None
 
-import regex as _re
+import re as _re
 def _clean_txt(x: str) -> str:
-    return _re.sub(r"\s+", " ", (x or "")).strip().lower()
-
-def _values_from_openpyxl(ws) -> list[list]:
-    vals = []
-    for r in ws.iter_rows(values_only=True):
-        vals.append(list(r))
-    return vals
+    # split()/join collapses whitespace runs and trims in C; no regex engine needed
+    return " ".join((x or "").split()).lower()
+
+def _values_from_openpyxl(ws) -> list[tuple]:
+    # a stale <dimension> tag makes read-only mode pad phantom rows/cols out to the declared
+    # extent; reset it so iter_rows streams only the cells the sheet actually holds
+    if hasattr(ws, "reset_dimensions"):
+        ws.reset_dimensions()
+    # read-only iter_rows already yields fresh tuples; keep them rather than copying each into a list
+    rows = list(ws.iter_rows(values_only=True))
+    # without declared dimensions rows are ragged; pad the short ones so callers keep a rectangle
+    width = max(map(len, rows), default=0)
+    for i, row in enumerate(rows):
+        if len(row) < width:
+            rows[i] = row + (None,) * (width - len(row))
+    return rows
+
+def _load_values(src, pick_sheet) -> Tuple[str, List[List]]:
+    """
+    Read one worksheet's cached values as a list of rows.
+    `src` is a path or a seekable binary file object (e.g. the spooled upload).
+    `pick_sheet(sheetnames) -> name` resolves the target sheet.
+    Uses python-calamine when installed, otherwise openpyxl read-only;
+    empty cells are None either way so downstream parsers see the same shape.
+    """
+    if CalamineWorkbook is not None:
+        try:
+            cwb = (CalamineWorkbook.from_filelike(src) if hasattr(src, "read")
+                   else CalamineWorkbook.from_path(src))
+            target = pick_sheet(list(cwb.sheet_names))
+            rows = cwb.get_sheet_by_name(target).to_python(skip_empty_area=False)
+            for row in rows:  # normalize blanks in place: no second copy of the sheet
+                for j, c in enumerate(row):
+                    if c == "":
+                        row[j] = None
+            return target, rows
+        except Exception:
+            pass  # fall back to openpyxl below
+    if hasattr(src, "seek"):
+        src.seek(0)
+    wb = load_workbook(src, data_only=True, read_only=True)
+    try:
+        target = pick_sheet(wb.sheetnames)
+        return target, _values_from_openpyxl(wb[target])
+    finally:
+        try: wb.close()
+        except Exception: pass
 
 
 # ---------------------- ADMIN TOTALS INGEST (existing) ----------------------
@@ -150,6 +270,10 @@ _METRIC_KEYS = {
     "Realized Gain/Loss": "realized",
     "Management Fees": "fees",
 }
+# compiled once at import; _metric_for_column runs per date column per sheet
+_COMPILED_LABEL_ALIASES = {
+    name: tuple(_re.compile(p, _re.I) for p in pats) for name, pats in _LABEL_ALIASES.items()
+}
 
 def _find_header_row_and_date_columns(values: List[List], max_scan_rows: int = 200, anchor_row: Optional[int] = None) -> Tuple[Optional[int], Dict[int, date]]:
     candidates: List[Tuple[int, Dict[int, date]]] = []
@@ -160,10 +284,9 @@ def _find_header_row_and_date_columns(values: List[List], max_scan_rows: int = 2
         row = values[r - 1]
         for c in range(1, cols + 1):
             v = row[c - 1] if c - 1 < len(row) else None
-            if _looks_like_date(v):
-                d = _parse_date_any(v)
-                if d:
-                    local[c] = d
+            d = _parse_date_any(v)
+            if d:
+                local[c] = d
         if len(local) >= 2:
             candidates.append((r, local))
     if not candidates:
@@ -176,19 +299,63 @@ def _find_header_row_and_date_columns(values: List[List], max_scan_rows: int = 2
     candidates.sort(key=lambda x: (-len(x[1]), x[0]))
     return candidates[0]
 
-def _metric_for_column(values: List[List], header_row_1b: int, col_1b: int) -> Optional[str]:
-    compiled = {name: [_re.compile(p, _re.I) for p in pats] for name, pats in _LABEL_ALIASES.items()}
+def _match_metric(txt: str) -> Optional[str]:
+    for canonical, patterns in _COMPILED_LABEL_ALIASES.items():
+        if any(p.fullmatch(txt) for p in patterns):
+            return _METRIC_KEYS.get(canonical)
+    return None
+
+def _cleaned_rows(values: List[List], max_rows: int = 250) -> List[List[str]]:
+    """_clean_txt of every text cell in the top rows ("" for non-text), built once per sheet."""
+    return [[_clean_txt(c) if isinstance(c, str) else "" for c in row] for row in islice(values, max_rows)]
+
+def _metrics_by_column(cleaned: List[List[str]], header_row_1b: int, cols_1b) -> Dict[int, str]:
+    """
+    For every date column, the metric named by the nearest label cell within 12 rows
+    of the header (same search order as before: distance first, above before below).
+    Walks the window of the cleaned rows once for all columns; each distinct label
+    text is matched once.
+    """
+    out: Dict[int, str] = {}
+    todo = set(cols_1b)
+    memo: Dict[str, Optional[str]] = {}
+    visited = set()
     for d in range(0, 13):
         for r in (header_row_1b - d, header_row_1b + d):
-            if r < 1:
+            if r < 1 or r in visited:
                 continue
-            row = values[r - 1] if r - 1 < len(values) else []
-            cell = row[col_1b - 1] if col_1b - 1 < len(row) else None
-            txt = _clean_txt("" if cell is None else str(cell))
-            for canonical, patterns in compiled.items():
-                if any(p.fullmatch(txt) for p in patterns):
-                    return _METRIC_KEYS.get(canonical)
-    return None
+            visited.add(r)
+            row = cleaned[r - 1] if r - 1 < len(cleaned) else ()
+            for col_1b in list(todo):
+                txt = row[col_1b - 1] if col_1b - 1 < len(row) else ""
+                if not txt:
+                    continue  # metric labels are text; numbers/dates never match
+                if txt not in memo:
+                    memo[txt] = _match_metric(txt)
+                if memo[txt]:
+                    out[col_1b] = memo[txt]
+                    todo.discard(col_1b)
+            if not todo:
+                return out
+    return out
+
+_ADMIN_LABEL_KEYS = {_clean_txt(label): key for label, key in _METRIC_KEYS.items()}
+
+def _find_label_rows(cleaned: List[List[str]]) -> Dict[str, Optional[int]]:
+    """First 1-based row of each admin totals label (beginning/ending/...), found in one scan."""
+    out: Dict[str, Optional[int]] = {key: None for key in _ADMIN_LABEL_KEYS.values()}
+    remaining = len(out)
+    for r_i, row in enumerate(cleaned, start=1):
+        for x in row:
+            if not x:
+                continue
+            key = _ADMIN_LABEL_KEYS.get(x)
+            if key and out[key] is None:
+                out[key] = r_i
+                remaining -= 1
+        if not remaining:
+            break
+    return out
 
 def _next_metric_label_below(values: List[List], start_row_1b: int, all_label_rows: List[Optional[int]]) -> Optional[int]:
     below = [r for r in all_label_rows if r and r > start_row_1b]
@@ -208,10 +375,14 @@ def _sum_investor_rows_ignore_total(
         row = values[r - 1] if r - 1 < len(values) else []
         name_val = row[name_col_1b - 1] if name_col_1b - 1 < len(row) else None
         id_val   = row[id_col_1b   - 1] if id_col_1b   - 1 < len(row) else None
-        name_txt = _clean_txt("" if name_val is None else str(name_val))
-        if name_txt in FORBIDDEN:
-            r += 1; blanks = 0; continue
-        is_partner_row = bool(name_txt) or (isinstance(id_val, (int, float)) or (isinstance(id_val, str) and id_val.strip()))
+        if isinstance(name_val, str):
+            name_txt = _clean_txt(name_val)
+            if name_txt in FORBIDDEN:
+                r += 1; blanks = 0; continue
+            has_name = bool(name_txt)
+        else:
+            has_name = name_val is not None  # a non-text name (e.g. numeric) still marks a partner row
+        is_partner_row = has_name or (isinstance(id_val, (int, float)) or (isinstance(id_val, str) and id_val.strip()))
         if not is_partner_row:
             blanks += 1
             if blanks >= max_blank_streak: break
@@ -225,110 +396,110 @@ def _sum_investor_rows_ignore_total(
         r += 1
     return total if have else None
 
+def _parse_admin_totals(values: List[List]) -> Dict[date, Dict[str, Optional[float]]]:
+    """
+    Pure parse of the totals block: month-end date -> {beginning, ending, unrealized, realized, fees}.
+    Raises RuntimeError when no header row with month/date columns is found.
+    """
+    cleaned = _cleaned_rows(values)  # shared by the label scans below
+
+    # anchor near 'ending balance'
+    lbl_end = None
+    for r_i, row in enumerate(islice(cleaned, 200), start=1):
+        if any("ending balance" in x for x in row):
+            lbl_end = r_i; break
+
+    hdr_row, date_cols = _find_header_row_and_date_columns(values, max_scan_rows=200, anchor_row=(lbl_end or 200))
+    if not hdr_row or not date_cols:
+        raise RuntimeError("No header row with month/date columns found near totals block.")
+
+    label_rows = _find_label_rows(cleaned)
+    all_label_rows = list(label_rows.values())
+
+    metric_by_col = _metrics_by_column(cleaned, hdr_row, date_cols.keys())
+    totals_by_date: Dict[date, Dict[str, Optional[float]]] = {}
+    for col1b, dt in sorted(date_cols.items()):
+        as_of = date(dt.year, dt.month, monthrange(dt.year, dt.month)[1])
+        rec = totals_by_date.get(as_of) or dict(beginning=None, ending=None, unrealized=None, realized=None, fees=None)
+
+        metric = metric_by_col.get(col1b)
+        if not metric:
+            totals_by_date[as_of] = rec; continue
+
+        start_row = label_rows.get(metric)
+        if not start_row:
+            totals_by_date[as_of] = rec; continue
+
+        stop_row = _next_metric_label_below(values, start_row, all_label_rows)
+        val = _sum_investor_rows_ignore_total(values, start_label_row_1b=start_row, date_col_1b=col1b, stop_row_1b=stop_row)
+        rec[metric] = val
+        totals_by_date[as_of] = rec
+
+    # carry forward missing beginnings
+    for d in sorted(totals_by_date.keys()):
+        if totals_by_date[d]["beginning"] is None:
+            prevs = [p for p in totals_by_date if p < d]
+            if prevs:
+                totals_by_date[d]["beginning"] = totals_by_date[max(prevs)]["ending"]
+
+    return totals_by_date
+
+def _upsert_admin_totals(target: str, totals_by_date: Dict[date, Dict[str, Optional[float]]], commit: bool = True) -> List[str]:
+    """Upsert parsed totals into PortfolioPeriodMetric; returns the ISO dates written.
+    commit=False leaves the rows in the caller's transaction."""
+    insert_fn = _dialect_insert()
+    upserted = []
+    for dt_key, rec in sorted(totals_by_date.items()):
+        values_row = dict(
+            sheet=target,
+            beginning_balance=rec["beginning"],
+            ending_balance=rec["ending"],
+            unrealized_gain_loss=rec["unrealized"],
+            realized_gain_loss=rec["realized"],
+            management_fees=rec["fees"],
+            source="upload"
+        )
+        values_row[DATE_COL] = dt_key
+
+        stmt = insert_fn(PortfolioPeriodMetric).values(**values_row)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["sheet", DATE_COL],
+            set_={
+                "beginning_balance": stmt.excluded.beginning_balance,
+                "ending_balance": stmt.excluded.ending_balance,
+                "unrealized_gain_loss": stmt.excluded.unrealized_gain_loss,
+                "realized_gain_loss": stmt.excluded.realized_gain_loss,
+                "management_fees": stmt.excluded.management_fees,
+                "updated_at": datetime.utcnow(),
+                "source": stmt.excluded.source,
+            },
+        )
+        db.session.execute(stmt)
+        upserted.append(dt_key.isoformat())
+    if commit:
+        db.session.commit()
+
+    if not upserted:
+        raise RuntimeError("No month columns were detected in the uploaded sheet.")
+    return upserted
+
 def _ingest_local_admin_totals(xlsx_path: str, sheet: str | None = None) -> dict:
     """
     Parses totals (Beginning/Ending/Unrealized/Realized/Fee) by month and upserts into PortfolioPeriodMetric.
     Returns: {"sheet": <resolved>, "upserted": [ISO dates], "values": <full used-range as lists>}
     """
-    wb = load_workbook(xlsx_path, data_only=True, read_only=True)
-    try:
-        target = sheet or wb.sheetnames[0]
-        if target not in wb.sheetnames:
+    def _pick(sheetnames: List[str]) -> str:
+        target = sheet or sheetnames[0]
+        if target not in sheetnames:
             want = _clean_txt(target)
-            for nm in wb.sheetnames:
+            for nm in sheetnames:
                 if _clean_txt(nm) == want or want in _clean_txt(nm):
                     target = nm; break
+        return target
 
-        ws = wb[target]
-        values = _values_from_openpyxl(ws)
-
-        # anchor near 'ending balance'
-        lbl_end = None
-        for r_i, row in enumerate(values[:200], start=1):
-            if any("ending balance" in str(x).lower() for x in row if x is not None):
-                lbl_end = r_i; break
-
-        hdr_row, date_cols = _find_header_row_and_date_columns(values, max_scan_rows=200, anchor_row=(lbl_end or 200))
-        if not hdr_row or not date_cols:
-            raise RuntimeError("No header row with month/date columns found near totals block.")
-
-        def _find_label(label):
-            for r_i, row in enumerate(values[:250], start=1):
-                if any(_clean_txt(str(x)) == _clean_txt(label) for x in row if x is not None):
-                    return r_i
-            return None
-
-        lbl_begin = _find_label("Beginning Balance")
-        lbl_end   = _find_label("Ending Balance")
-        lbl_unrl  = _find_label("Unrealized Gain/Loss")
-        lbl_rlzd  = _find_label("Realized Gain/Loss")
-        lbl_fees  = _find_label("Management Fees")
-        label_rows = {"beginning": lbl_begin, "ending": lbl_end, "unrealized": lbl_unrl, "realized": lbl_rlzd, "fees": lbl_fees}
-        all_label_rows = [lbl_begin, lbl_end, lbl_unrl, lbl_rlzd, lbl_fees]
-
-        totals_by_date: Dict[date, Dict[str, Optional[float]]] = {}
-        for col1b, dt in sorted(date_cols.items()):
-            as_of = date(dt.year, dt.month, monthrange(dt.year, dt.month)[1])
-            rec = totals_by_date.get(as_of) or dict(beginning=None, ending=None, unrealized=None, realized=None, fees=None)
-
-            metric = _metric_for_column(values, hdr_row, col1b)
-            if not metric:
-                totals_by_date[as_of] = rec; continue
-
-            start_row = label_rows.get(metric)
-            if not start_row:
-                totals_by_date[as_of] = rec; continue
-
-            stop_row = _next_metric_label_below(values, start_row, all_label_rows)
-            val = _sum_investor_rows_ignore_total(values, start_label_row_1b=start_row, date_col_1b=col1b, stop_row_1b=stop_row)
-            rec[metric] = val
-            totals_by_date[as_of] = rec
-
-        # carry forward missing beginnings
-        for d in sorted(totals_by_date.keys()):
-            if totals_by_date[d]["beginning"] is None:
-                prevs = [p for p in totals_by_date if p < d]
-                if prevs:
-                    totals_by_date[d]["beginning"] = totals_by_date[max(prevs)]["ending"]
-
-        insert_fn = _dialect_insert()
-        upserted = []
-        for dt_key, rec in sorted(totals_by_date.items()):
-            values_row = dict(
-                sheet=target,
-                beginning_balance=rec["beginning"],
-                ending_balance=rec["ending"],
-                unrealized_gain_loss=rec["unrealized"],
-                realized_gain_loss=rec["realized"],
-                management_fees=rec["fees"],
-                source="upload"
-            )
-            values_row[DATE_COL] = dt_key
-
-            stmt = insert_fn(PortfolioPeriodMetric).values(**values_row)
-            stmt = stmt.on_conflict_do_update(
-                index_elements=["sheet", DATE_COL],
-                set_={
-                    "beginning_balance": stmt.excluded.beginning_balance,
-                    "ending_balance": stmt.excluded.ending_balance,
-                    "unrealized_gain_loss": stmt.excluded.unrealized_gain_loss,
-                    "realized_gain_loss": stmt.excluded.realized_gain_loss,
-                    "management_fees": stmt.excluded.management_fees,
-                    "updated_at": datetime.utcnow(),
-                    "source": stmt.excluded.source,
-                },
-            )
-            db.session.execute(stmt)
-            upserted.append(dt_key.isoformat())
-        db.session.commit()
-
-        if not upserted:
-            raise RuntimeError("No month columns were detected in the uploaded sheet.")
-
-        return {"sheet": target, "upserted": upserted, "values": values}
-    finally:
-        try: wb.close()
-        except Exception: pass
+    target, values = _load_values(xlsx_path, _pick)
+    upserted = _upsert_admin_totals(target, _parse_admin_totals(values))
+    return {"sheet": target, "upserted": upserted, "values": values}
 
 
 # ---------------------- SHEET RESOLUTION (mirror SP) ----------------------
@@ -350,29 +521,27 @@ def _sheet_candidates(name: str) -> list[str]:
 
 
 # ---------------------- FILE CLASSIFIER ----------------------
-def _has_investments_table(values: List[List]) -> bool:
-    limit = min(200, len(values))
-    for r in range(limit):
-        row = values[r] or []
-        for cell in row:
-            if str(cell or "").strip().lower() == "investments":
-                return True
-    return False
-
-def _has_balance_labels(values: List[List]) -> bool:
-    labels = {"beginning balance", "ending balance", "unrealized gain/loss", "realized gain/loss", "management fees"}
-    limit = min(250, len(values))
-    for r in range(limit):
-        row = values[r] or []
-        for cell in row:
-            txt = str(cell or "").strip().lower()
-            if txt in labels:
-                return True
-    return False
+_BALANCE_LABELS = frozenset({
+    "beginning balance", "ending balance", "unrealized gain/loss", "realized gain/loss", "management fees",
+})
 
 def _classify_workbook(values: List[List]) -> str:
-    has_inv = _has_investments_table(values)
-    has_bal = _has_balance_labels(values)
+    """
+    One pass over the top of the sheet: an 'Investments' cell in the first 200 rows
+    and/or a balance label in the first 250. Stops as soon as both are seen.
+    """
+    has_inv = has_bal = False
+    for r, row in enumerate(islice(values, 250)):
+        for cell in row or ():
+            if not isinstance(cell, str):
+                continue  # labels are text; numbers/dates can never match
+            txt = cell.strip().lower()
+            if not has_inv and r < 200 and txt == "investments":
+                has_inv = True
+            elif not has_bal and txt in _BALANCE_LABELS:
+                has_bal = True
+        if has_inv and has_bal:
+            break
     if has_inv and has_bal: return "mixed"
     if has_inv: return "investment"
     if has_bal: return "balance"
@@ -395,15 +564,20 @@ _MONTHS = {
     "dec": 12, "december": 12,
 }
 
+_INVEST_MAX_ROWS = 5000
+_INVEST_HDR = _re.compile(r"^invest(ment|ments)\b")
+_YEAR_FULLMATCH = _re.compile(r"\s*(20\d{2})\s*")
+_YEAR_SEARCH = _re.compile(r"\b(20\d{2})\b")
+_HAS_ALPHA = _re.compile(r"[a-z]")
+
 def _find_header_row(values: List[List]) -> int:
     upto = min(80, len(values))
     for i in range(upto):
-        row = [str(x or "").strip().lower() for x in values[i]]
-        if any(_re.match(r"^invest(ment|ments)\b", c) for c in row):
+        if any(_INVEST_HDR.match(x.strip().lower()) for x in values[i] if isinstance(x, str)):
             return i
     for i in range(upto):
-        row = [str(x or "").strip().lower() for x in values[i]]
-        if any(row):
+        # first row with any non-blank cell (falsy values like 0 count as blank, as before)
+        if any(x and (not isinstance(x, str) or x.strip()) for x in values[i]):
             return i
     return 0
 
@@ -416,76 +590,65 @@ def _detect_year_banners(values: List[List], top_rows: int = 6) -> Dict[int, int
     for r in range(upto):
         row = values[r] or []
         for j, cell in enumerate(row):
-            if isinstance(cell, (int, float)):
-                continue
-            txt_raw = "" if cell is None else str(cell)
-            txt = _clean_txt(txt_raw)
+            if not isinstance(cell, str):
+                continue  # numbers/dates/None never carry a text year banner
+            txt = _clean_txt(cell)
             if not txt:
                 continue
-            if _re.fullmatch(r"\s*(20\d{2})\s*", txt):
-                year_by_col.setdefault(j, int(_re.fullmatch(r"\s*(20\d{2})\s*", txt).group(1)))
+            m = _YEAR_FULLMATCH.fullmatch(txt)
+            if m:
+                year_by_col.setdefault(j, int(m.group(1)))
                 continue
-            if not _re.search(r"[a-z]", txt):
+            if not _HAS_ALPHA.search(txt):
                 continue
-            m = _re.search(r"\b(20\d{2})\b", txt)
+            m = _YEAR_SEARCH.search(txt)
             if m:
                 year_by_col.setdefault(j, int(m.group(1)))
     return year_by_col
 
-def _detect_date_columns(
-    values: List[List],
-    header_row_idx: int,
-    preferred_year: Optional[int] = None
-) -> Dict[int, date]:
-    from calendar import monthrange as _mr
-
-    rows = len(values)
-    cols = max((len(r) for r in values), default=0)
-
-    def _row_txts(ridx: int) -> List[str]:
-        row = values[ridx] if 0 <= ridx < rows else []
-        return [_clean_txt(str(row[j])) if j < len(row) else "" for j in range(cols)]
-
-    MONTHS = {
-        "jan": 1, "january": 1, "feb": 2, "february": 2, "mar": 3, "march": 3,
-        "apr": 4, "april": 4, "may": 5, "jun": 6, "june": 6, "jul": 7, "july": 7,
-        "aug": 8, "august": 8, "sep": 9, "sept": 9, "september": 9,
-        "oct": 10, "october": 10, "nov": 11, "november": 11,
-        "dec": 12, "december": 12,
-    }
+def _row_txts(values: List[List], ridx: int, cols: int) -> List[str]:
+    row = values[ridx] if 0 <= ridx < len(values) else []
+    return [_clean_txt(row[j]) if j < len(row) and isinstance(row[j], str) else "" for j in range(cols)]
 
-    def _month_map_for_row(ridx: int) -> Dict[int, date]:
-        out: Dict[int, date] = {}
-        txts = _row_txts(ridx)
-        for j, t in enumerate(txts):
-            if t in MONTHS:
-                m = MONTHS[t]
-                y = preferred_year if preferred_year is not None else None
-                if y:
-                    out[j] = date(y, m, _mr(y, m)[1])
+def _month_map_for_row(values: List[List], ridx: int, year: int) -> Dict[int, date]:
+    out: Dict[int, date] = {}
+    if not 0 <= ridx < len(values):
         return out
+    for j, cell in enumerate(values[ridx] or []):
+        if not isinstance(cell, str):
+            continue
+        m = _MONTHS.get(_clean_txt(cell))
+        if m:
+            out[j] = date(year, m, monthrange(year, m)[1])
+    return out
 
-    if preferred_year is not None:
-        out = _month_map_for_row(header_row_idx)
+def _detect_date_columns_with_year(values: List[List], header_row_idx: int, year: int) -> Dict[int, date]:
+    """Month-name header walk for a known year; {} means fall back to _detect_date_columns_infer."""
+    out = _month_map_for_row(values, header_row_idx, year)
+    if out:
+        return out
+    for off in (1, -1, 2, -2, 3, -3):
+        out = _month_map_for_row(values, header_row_idx + off, year)
         if out:
             return out
-        for off in [1, -1, 2, -2, 3, -3]:
-            out = _month_map_for_row(header_row_idx + off)
-            if out:
-                return out
-        for ridx in range(min(rows, 8)):
-            out = _month_map_for_row(ridx)
-            if out:
-                return out
+    for ridx in range(min(len(values), 8)):
+        out = _month_map_for_row(values, ridx, year)
+        if out:
+            return out
+    return {}
+
+def _detect_date_columns_infer(values: List[List], header_row_idx: int) -> Dict[int, date]:
+    rows = len(values)
+    cols = max((len(r) for r in values), default=0)
 
     for r in range(0, min(rows, 120)):
         row = values[r] if r < rows else []
-        if any(_clean_txt(str(c)) == "ending date" for c in row):
+        if any(_clean_txt(c) == "ending date" for c in row if isinstance(c, str)):
             out: Dict[int, date] = {}
             for j, c in enumerate(row):
                 dt = _parse_date_any(c)
                 if dt:
-                    out[j] = date(dt.year, dt.month, _mr(dt.year, dt.month)[1])
+                    out[j] = _month_end(dt)
             if out:
                 return out
 
@@ -502,7 +665,7 @@ def _detect_date_columns(
         for j, c in enumerate(row):
             dt = _parse_date_any(c)
             if dt:
-                out[j] = date(dt.year, dt.month, _mr(dt.year, dt.month)[1])
+                out[j] = _month_end(dt)
         if out:
             return out
 
@@ -511,7 +674,7 @@ def _detect_date_columns(
     for j in range(cols):
         dt = _parse_date_any(header[j] if j < len(header) else None)
         if dt:
-            out[j] = date(dt.year, dt.month, _mr(dt.year, dt.month)[1])
+            out[j] = _month_end(dt)
     if out:
         return out
 
@@ -521,18 +684,18 @@ def _detect_date_columns(
         rights = [c for c in sorted(year_banners) if c > col]
         return year_banners[rights[0]] if rights else None
 
-    header_txts = _row_txts(header_row_idx)
+    header_txts = _row_txts(values, header_row_idx, cols)
     current_year: Optional[int] = None
     out = {}
     for j in range(cols):
         if j in year_banners:
             current_year = year_banners[j]
         hdr = header_txts[j]
-        if hdr in MONTHS:
+        if hdr in _MONTHS:
             y = current_year if current_year is not None else _nearest_banner_year_to_right(j)
             if y:
-                m = MONTHS[hdr]
-                out[j] = date(y, m, _mr(y, m)[1])
+                m = _MONTHS[hdr]
+                out[j] = date(y, m, monthrange(y, m)[1])
     if out:
         return out
 
@@ -542,7 +705,7 @@ def _detect_date_columns(
         while r >= 0:
             dt = _parse_date_any(values[r][j] if j < len(values[r]) else None)
             if dt:
-                out[j] = date(dt.year, dt.month, _mr(dt.year, dt.month)[1])
+                out[j] = _month_end(dt)
                 break
             r -= 1
     return out
@@ -556,11 +719,35 @@ def _ensure_color(i: int) -> str:
     ]
     return palette[i % len(palette)]
 
+def _upsert_investment_values(pending: Dict[Tuple[int, date], float], source_id: Optional[int], chunk: int = 500) -> None:
+    """Core INSERT .. ON CONFLICT (investment_id, as_of_date) DO UPDATE, in chunks."""
+    if not pending:
+        return
+    now = datetime.utcnow()
+    rows = [
+        dict(investment_id=inv_id, as_of_date=mdt, value=val,
+             source="valuation_sheet", source_id=source_id, created_at=now)
+        for (inv_id, mdt), val in pending.items()
+    ]
+    insert_fn = _dialect_insert()
+    for i in range(0, len(rows), chunk):
+        stmt = insert_fn(PortfolioInvestmentValue.__table__).values(rows[i:i + chunk])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["investment_id", "as_of_date"],
+            set_={
+                "value": stmt.excluded.value,
+                "source": stmt.excluded.source,
+                "source_id": stmt.excluded.source_id,
+            },
+        )
+        db.session.execute(stmt)
+
 def _ingest_investments_table(
     values: List[List],
     resolved_sheet: str,
     source_id: Optional[int],
     preferred_year: Optional[int] = None,
+    commit: bool = True,
 ) -> Dict[str, Any]:
     if not values or len(values) < 2:
         return {"ok": False, "error": "No cells to parse", "sheet": resolved_sheet}
@@ -571,7 +758,7 @@ def _ingest_investments_table(
 
     name_idx = None
     for j, h in enumerate(header_lc):
-        if _re.match(r"^invest(ment|ments)\b", h or ""):
+        if _INVEST_HDR.match(h or ""):
             name_idx = j
             break
     if name_idx is None:
@@ -583,7 +770,11 @@ def _ingest_investments_table(
             "note": "No Investments column found in header.",
         }
 
-    date_cols = _detect_date_columns(values, header_row_idx, preferred_year=preferred_year)
+    date_cols: Dict[int, date] = {}
+    if preferred_year is not None:
+        date_cols = _detect_date_columns_with_year(values, header_row_idx, preferred_year)
+    if not date_cols:
+        date_cols = _detect_date_columns_infer(values, header_row_idx)
     if not date_cols:
         return {"ok": False, "error": "Could not locate monthly date columns for investments grid.", "sheet": resolved_sheet}
 
@@ -592,15 +783,17 @@ def _ingest_investments_table(
         if not date_cols:
             return {"ok": False, "error": f"No monthly columns resolved for year {preferred_year}.", "sheet": resolved_sheet}
 
-    body = values[header_row_idx + 1 :]
+    # the grid ends at "Portfolio Total"; never walk further than _INVEST_MAX_ROWS below the header
+    body = islice(values, header_row_idx + 1, header_row_idx + 1 + _INVEST_MAX_ROWS)
 
     inserted_vals = 0
-    ensured: Dict[str, int] = {}
-    ensured_order: List[str] = []
-
     STOP_AT_NAME = "portfolio total"
     blank_streak = 0
 
+    # pass 1: collect the investment rows and their names in sheet order
+    named_rows: List[Tuple[str, Any]] = []
+    ensured_order: List[str] = []
+    seen: set = set()
     for r in body:
         name = str(r[name_idx] if name_idx < len(r) else "").strip()
         clean_name = _clean_txt(name)
@@ -617,35 +810,48 @@ def _ingest_investments_table(
         if clean_name in {"total", "grand total"}:
             continue
 
-        if name not in ensured:
-            inv = Investment.query.filter_by(name=name).first()
-            if not inv:
-                inv = Investment(name=name, color_hex=_ensure_color(len(ensured_order)))
-                db.session.add(inv)
-                db.session.flush()
-            ensured[name] = int(inv.id)
+        named_rows.append((name, r))
+        if name not in seen:
+            seen.add(name)
             ensured_order.append(name)
-        inv_id = ensured[name]
 
-        for j0b, mdt in sorted(date_cols.items(), key=lambda x: (x[1].year, x[1].month)):
+    # one SELECT for the known investments, one flush for all the new ones
+    name_to_id: Dict[str, int] = {}
+    if ensured_order:
+        name_to_id = {
+            n: int(i) for i, n in
+            db.session.query(Investment.id, Investment.name).filter(Investment.name.in_(ensured_order)).all()
+        }
+    new_objs = [
+        Investment(name=n, color_hex=_ensure_color(idx))
+        for idx, n in enumerate(ensured_order) if n not in name_to_id
+    ]
+    if new_objs:
+        db.session.add_all(new_objs)
+        db.session.flush()
+        for inv in new_objs:
+            name_to_id[inv.name] = int(inv.id)
+
+    # pass 2: values only. (investment_id, as_of_date) -> value; later sheet rows win, as before
+    pending: Dict[Tuple[int, date], float] = {}
+    ordered_cols = sorted(date_cols.items(), key=lambda x: (x[1].year, x[1].month))
+    for name, r in named_rows:
+        inv_id = name_to_id[name]
+        for j0b, mdt in ordered_cols:
             v = r[j0b] if j0b < len(r) else None
             f = _to_float_cell(v)
             if math.isnan(f):
                 continue
 
-            row = PortfolioInvestmentValue.query.filter_by(investment_id=inv_id, as_of_date=mdt).first()
-            if row is None:
-                row = PortfolioInvestmentValue(investment_id=inv_id, as_of_date=mdt)
-            row.value = float(f)
-            row.source = "valuation_sheet"
-            row.source_id = source_id
-            db.session.add(row)
+            pending[(inv_id, mdt)] = float(f)
             inserted_vals += 1
 
-    db.session.commit()
+    _upsert_investment_values(pending, source_id)
+    if commit:
+        db.session.commit()
     return {
         "ok": True,
-        "investments": len(ensured),
+        "investments": len(ensured_order),
         "values": inserted_vals,
         "sheet": resolved_sheet,
         "year": preferred_year,
@@ -677,38 +883,30 @@ def upload_and_ingest():
     if ext not in {".xlsx", ".xlsm", ".xls"}:
         return jsonify(error=f"Unsupported type: {ext}"), 400
 
-    path = os.path.join(UPLOAD_FOLDER, filename)
-    f.save(path)
+    # keep the upload in memory; only spills to a temp file past _UPLOAD_SPOOL_MAX
+    buf = tempfile.SpooledTemporaryFile(max_size=_UPLOAD_SPOOL_MAX)
+    f.save(buf, buffer_size=1 << 20)
+    buf.seek(0)
 
     try:
         # --- Resolve sheet + read values FIRST (so we can classify before ingesting) ---
-        wb = load_workbook(path, data_only=True, read_only=True)
-        try:
-            if sheet and sheet in wb.sheetnames:
-                resolved_sheet = sheet
-            else:
-                resolved_sheet = None
-                if sheet:
-                    for sn in (_sheet_candidates(sheet) or [sheet]):
-                        if sn in wb.sheetnames:
-                            resolved_sheet = sn; break
-                    if not resolved_sheet:
-                        want = _normalize_sheet_name(sheet)
-                        for n in wb.sheetnames:
-                            if _normalize_sheet_name(n) == want:
-                                resolved_sheet = n; break
-                        if not resolved_sheet:
-                            for n in wb.sheetnames:
-                                if want in _normalize_sheet_name(n):
-                                    resolved_sheet = n; break
-                if not resolved_sheet:
-                    resolved_sheet = "Master" if "Master" in wb.sheetnames else wb.sheetnames[0]
-
-            ws = wb[resolved_sheet]
-            values = [[c.value for c in row]
-                      for row in ws.iter_rows(min_row=1, max_row=ws.max_row, max_col=ws.max_column)]
-        finally:
-            wb.close()
+        def _pick(sheetnames: List[str]) -> str:
+            if sheet and sheet in sheetnames:
+                return sheet
+            if sheet:
+                for sn in (_sheet_candidates(sheet) or [sheet]):
+                    if sn in sheetnames:
+                        return sn
+                want = _normalize_sheet_name(sheet)
+                for n in sheetnames:
+                    if _normalize_sheet_name(n) == want:
+                        return n
+                for n in sheetnames:
+                    if want in _normalize_sheet_name(n):
+                        return n
+            return "Master" if "Master" in sheetnames else sheetnames[0]
+
+        resolved_sheet, values = _load_values(buf, _pick)
 
         # --- Classify THIS sheet and decide which pipelines to run ---
         normalized = _normalize_sheet_name(resolved_sheet)
@@ -716,12 +914,16 @@ def upload_and_ingest():
 
         is_master = normalized == "master"
         looks_balance = ("bcas" in normalized) or ("q4adj" in normalized) or (file_type == "balance")
-        looks_invest  = is_master or (file_type == "investment")
+        # a "Master" name alone isn't enough: the classifier must have seen an Investments table
+        looks_invest  = (is_master and file_type in ("investment", "mixed")) or (file_type == "investment")
 
         if file_type == "mixed":
             looks_invest = is_master
             looks_balance = not is_master
 
+        # Everything below runs in ONE transaction, committed once at the end; the optional
+        # steps use savepoints so their failure doesn't discard the rest of the upload.
+
         # --- Optional lineage record (before any writes that need ds_id) ---
         ds_id = None
         if DataSource is not None:
@@ -729,24 +931,23 @@ def upload_and_ingest():
                 added_by = None
                 if current_user and getattr(current_user, "is_authenticated", False):
                     added_by = getattr(current_user, "email", None) or getattr(current_user, "username", None)
-                ds = DataSource(
-                    kind="upload",
-                    file_name=filename,
-                    sheet_name=resolved_sheet,
-                    added_by=added_by
-                )
-                db.session.add(ds)
-                db.session.flush()
+                with db.session.begin_nested():
+                    ds = DataSource(
+                        kind="upload",
+                        file_name=filename,
+                        sheet_name=resolved_sheet,
+                        added_by=added_by
+                    )
+                    db.session.add(ds)
                 ds_id = ds.id
-                db.session.commit()
             except Exception:
-                db.session.rollback()
                 ds_id = None  # non-fatal
 
         # --- 1) Admin totals ingest (ONLY for balance-type sheets) ---
         admin_res = {"upserted": []}
         if looks_balance:
-            admin_res = _ingest_local_admin_totals(path, resolved_sheet)
+            # reuse the values already read above instead of re-opening the workbook
+            admin_res = {"upserted": _upsert_admin_totals(resolved_sheet, _parse_admin_totals(values), commit=False)}
 
         # --- 2) Investor ingest (ONLY for balance-type sheets) ---
         payload = {}
@@ -757,6 +958,7 @@ def upload_and_ingest():
                 drive_id=None,
                 item_id=None,
                 source="upload",
+                commit=False,
             )
             payload = sp_resp.get_json() if hasattr(sp_resp, "get_json") else {}
 
@@ -764,9 +966,10 @@ def upload_and_ingest():
         inv_payload = {}
         if looks_invest:
             try:
-                inv_payload = _ingest_investments_table(
-                    values or [], resolved_sheet, ds_id, preferred_year=preferred_year
-                )
+                with db.session.begin_nested():
+                    inv_payload = _ingest_investments_table(
+                        values or [], resolved_sheet, ds_id, preferred_year=preferred_year, commit=False
+                    )
             except Exception as e:
                 inv_payload = {"ok": False, "error": f"Investments ingest failed: {e}", "sheet": resolved_sheet}
 
@@ -774,8 +977,6 @@ def upload_and_ingest():
         # --- Record upload history & cleanup ---
         db.session.add(ExcelUploadHistory(filename=filename, uploaded_at=datetime.utcnow()))
         db.session.commit()
-        try: os.remove(path)
-        except Exception: pass
 
         return jsonify({
             "ok": True,
@@ -795,3 +996,5 @@ def upload_and_ingest():
         db.session.rollback()
         traceback.print_exc()
         return jsonify(error="Upload/ingest failed. See server logs."), 500
+    finally:
+        buf.close()
@@ -4,15 +4,25 @@ import os
 import shutil
 import mimetypes
 import time, hmac, hashlib, base64
-from zipfile import ZipFile, ZIP_DEFLATED
-from flask import Blueprint, current_app, jsonify, request, send_file, abort, url_for
+import struct, zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from zipfile import ZipFile, ZIP_DEFLATED, ZIP_STORED
+from flask import Blueprint, Response, current_app, jsonify, request, send_file, abort, url_for
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
+from werkzeug.wsgi import FileWrapper
 from flask_login import login_required
 
 from backend.extensions import db
 from backend.models import FileNode
 
+# Optional streaming zip writer; without it folder zips are built in memory
+try:
+    from zipstream import ZipStream  # type: ignore
+except Exception:  # pragma: no cover
+    ZipStream = None
+
 files_bp = Blueprint("files", __name__)
 
 # ---------- helpers ----------
@@ -86,6 +96,241 @@ def _ownable_query(scope: str, user_id):
         q = q.filter_by(owner_id=None)
     return q
 
+# ---- zip helpers ----
+# formats that are already compressed (zip containers, images, media, pdf): deflating them
+# again burns CPU for ~0% size gain, so they go into archives stored
+_PRECOMPRESSED_EXTS = frozenset({
+    # zip-based office/document containers
+    ".xlsx", ".xlsm", ".xlsb", ".docx", ".docm", ".pptx", ".pptm", ".odt", ".ods", ".odp", ".epub",
+    # archives
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".rar",
+    # images, audio, video
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".heic", ".avif",
+    ".mp3", ".m4a", ".aac", ".ogg", ".flac", ".mp4", ".m4v", ".mov", ".mkv", ".webm",
+    ".pdf",
+})
+
+def _zip_compress_type(filename: str) -> int:
+    return ZIP_STORED if os.path.splitext(filename)[1].lower() in _PRECOMPRESSED_EXTS else ZIP_DEFLATED
+
+def _iter_files(base_dir: str):
+    """DirEntry for every regular file under base_dir (explicit scandir stack; symlinks are not followed)."""
+    stack = [base_dir]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    stack.append(e.path)
+                elif e.is_file(follow_symlinks=False):
+                    yield e
+
+def _zip_entries(base_dir: str):
+    """(abs_path, arcname, compress_type, DirEntry) for every file under base_dir; arcnames are relative to its parent."""
+    start = os.path.dirname(base_dir)
+    for e in _iter_files(base_dir):
+        yield e.path, os.path.relpath(e.path, start=start), _zip_compress_type(e.name), e
+
+# Parallel writer limits: each in-flight file is held whole in memory (raw + deflated), and
+# the hand-built archive has no zip64 records, so big files / huge folders take the regular
+# writers. Look-ahead is bounded by bytes: at most _PARALLEL_ZIP_INFLIGHT of input (plus one
+# file) is read ahead, so a download peaks at a few tens of MiB however many workers run.
+_PARALLEL_ZIP_WORKERS = min(8, os.cpu_count() or 1)
+_PARALLEL_ZIP_MAX_FILE = 16 << 20
+_PARALLEL_ZIP_INFLIGHT = 16 << 20
+_PARALLEL_ZIP_MAX_TOTAL = 3 << 30
+_PARALLEL_ZIP_MAX_ENTRIES = 0xFFFF
+
+def _deflate_one(abs_path: str, ctype: int, crc: int | None = None):
+    """
+    (crc32, uncompressed size, entry body) for one file; zlib releases the GIL while it works.
+    `crc` is the checksum recorded at upload, when known, so it isn't recomputed.
+    """
+    with open(abs_path, "rb") as fh:
+        data = fh.read()
+    if crc is None:
+        crc = zlib.crc32(data)
+    if ctype == ZIP_DEFLATED:
+        co = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)  # raw deflate, as zipfile writes
+        return crc, len(data), co.compress(data) + co.flush()
+    return crc, len(data), data
+
+def _dos_datetime(mtime: float):
+    t = time.localtime(mtime)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1  # 1980-01-01 00:00, the earliest DOS date
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+def _iter_parallel_zip(entries):
+    """
+    Yield a ZIP archive for [(abs_path, arcname, compress_type, mtime, size, crc|None)],
+    compressing files ahead on a thread pool while earlier entries stream out in order.
+    Read-ahead stops once _PARALLEL_ZIP_INFLIGHT bytes of input are queued or being written.
+    The central directory is assembled single-threaded at the end.
+    """
+    central = []
+    offset = 0
+    pending = deque()
+    todo = iter(entries)
+    nxt = next(todo, None)
+    inflight = 0
+    with ThreadPoolExecutor(max_workers=_PARALLEL_ZIP_WORKERS) as ex:
+        def _fill():
+            nonlocal nxt, inflight
+            # always keep one file going; beyond that, only while under the byte budget
+            while nxt is not None and (not pending or inflight + nxt[4] <= _PARALLEL_ZIP_INFLIGHT):
+                pending.append((nxt, ex.submit(_deflate_one, nxt[0], nxt[2], nxt[5])))
+                inflight += nxt[4]
+                nxt = next(todo, None)
+
+        _fill()
+        while pending:
+            (_, arcname, ctype, mtime, size, _), fut = pending.popleft()
+            crc, usize, body = fut.result()
+            name = arcname.replace(os.sep, "/").encode("utf-8")
+            dtime, ddate = _dos_datetime(mtime)
+            flags = 0x800  # utf-8 names
+            local = struct.pack(
+                "<IHHHHHIIIHH", 0x04034B50, 20, flags, ctype, dtime, ddate,
+                crc, len(body), usize, len(name), 0,
+            ) + name
+            yield local
+            yield body
+            central.append(struct.pack(
+                "<IHHHHHHIIIHHHHHII", 0x02014B50, (3 << 8) | 20, 20, flags, ctype, dtime, ddate,
+                crc, len(body), usize, len(name), 0, 0, 0, 0, 0o100644 << 16, offset,
+            ) + name)
+            offset += len(local) + len(body)
+            inflight -= size
+            del body
+            _fill()
+    cd = b"".join(central)
+    yield cd
+    yield struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, len(central), len(central), len(cd), offset, 0)
+
+def _known_crcs(paths) -> dict:
+    """path -> (crc32, size, mtime_ns) recorded at upload; the newest FileNode wins when a path was re-uploaded."""
+    out: dict = {}
+    paths = list(paths)
+    for i in range(0, len(paths), 5000):
+        rows = (
+            db.session.query(FileNode.path, FileNode.crc32, FileNode.size, FileNode.mtime_ns)
+            .filter(FileNode.path.in_(paths[i:i + 5000]), FileNode.crc32.isnot(None))
+            .order_by(FileNode.id)
+            .all()
+        )
+        for path, crc, size, mtime_ns in rows:
+            out[path] = (crc, size, mtime_ns)
+    return out
+
+def _parallel_zip_entries(base_dir: str):
+    """Entries for _iter_parallel_zip, or None when the folder is outside its limits."""
+    found = []
+    total = 0
+    for abs_path, arcname, ctype, entry in _zip_entries(base_dir):
+        st = entry.stat(follow_symlinks=False)
+        total += st.st_size
+        if st.st_size > _PARALLEL_ZIP_MAX_FILE or total > _PARALLEL_ZIP_MAX_TOTAL or len(found) >= _PARALLEL_ZIP_MAX_ENTRIES:
+            return None
+        found.append((abs_path, arcname, ctype, st))
+    known = _known_crcs(e[0] for e in found)
+    out = []
+    for abs_path, arcname, ctype, st in found:
+        crc, size, mtime_ns = known.get(abs_path, (None, None, None))
+        # trust the stored CRC only for the exact file it was computed from; anything
+        # rewritten since (or rows without an mtime) is checksummed again
+        fresh = size == st.st_size and mtime_ns == st.st_mtime_ns
+        out.append((abs_path, arcname, ctype, st.st_mtime, st.st_size, crc if fresh else None))
+    return out
+
+def _zip_response(base_dir: str, download_name: str):
+    """
+    Zip base_dir as an attachment, streamed while it is built. Folders of ordinary-sized
+    files are compressed on a thread pool (_iter_parallel_zip); otherwise zipstream-ng
+    streams it file by file, and without zipstream-ng it is built in a BytesIO first.
+    """
+    headers = {"Content-Disposition": f'attachment; filename="{download_name}"'}
+    entries = _parallel_zip_entries(base_dir)
+    if entries is not None:
+        return Response(_iter_parallel_zip(entries), mimetype="application/zip", headers=headers)
+
+    if ZipStream is not None:
+        zs = ZipStream(compress_type=ZIP_DEFLATED)
+        for abs_path, arcname, ctype, _ in _zip_entries(base_dir):
+            zs.add_path(abs_path, arcname=arcname, compress_type=ctype)
+        return Response(zs, mimetype="application/zip", headers=headers)
+
+    mem = io.BytesIO()
+    with ZipFile(mem, "w", ZIP_DEFLATED) as zf:
+        for abs_path, arcname, ctype, _ in _zip_entries(base_dir):
+            zf.write(abs_path, arcname=arcname, compress_type=ctype)
+    mem.seek(0)
+    return send_file(mem, as_attachment=True, download_name=download_name, mimetype="application/zip")
+
+def _store_upload(stream, dest: str):
+    """
+    Write an uploaded stream to dest; returns (crc32 or None, size).
+    Uploads too big for the parallel zip writer (which is the only CRC consumer) are copied
+    file-to-file in the kernel with os.sendfile when werkzeug spooled them to disk. Everything
+    else is copied in 1 MiB chunks, recording the CRC-32 on the way through.
+    """
+    src_fd = None
+    # fileno() on a SpooledTemporaryFile still held in memory forces rollover() to a temp
+    # file; small uploads stay in memory and go straight to the chunked copy
+    if getattr(stream, "_rolled", True):
+        try:
+            src_fd = stream.fileno()
+            src_size = os.fstat(src_fd).st_size
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            src_fd = None
+    if src_fd is not None and src_size > _PARALLEL_ZIP_MAX_FILE and hasattr(os, "sendfile"):
+        with open(dest, "wb") as out:
+            try:
+                copied = 0
+                while copied < src_size:
+                    n = os.sendfile(out.fileno(), src_fd, copied, src_size - copied)
+                    if n == 0:
+                        break
+                    copied += n
+                return None, copied
+            except OSError:
+                out.seek(0)
+                out.truncate()
+                stream.seek(0)  # kernel copy unsupported here: fall through to the chunked copy
+                return _copy_with_crc(stream, out)
+    with open(dest, "wb") as out:
+        return _copy_with_crc(stream, out)
+
+def _copy_with_crc(stream, out):
+    crc = size = 0
+    while True:
+        chunk = stream.read(1 << 20)
+        if not chunk:
+            break
+        out.write(chunk)
+        crc = zlib.crc32(chunk, crc)
+        size += len(chunk)
+    return crc, size
+
+def _node_mime(node: FileNode) -> str:
+    """MIME type recorded on the node; rows from before the column existed are guessed once here."""
+    return node.mime_type or mimetypes.guess_type(node.name)[0] or "application/octet-stream"
+
+def _send_path(path: str, **kwargs):
+    """
+    send_file for an on-disk path. Without a server wsgi.file_wrapper (sendfile), werkzeug
+    streams the body through its FileWrapper in 8 KiB reads; widen that to 1 MiB.
+    """
+    resp = send_file(path, **kwargs)
+    body = getattr(resp, "response", None)
+    body = getattr(body, "iterable", body)  # unwrap the Range wrapper for partial responses
+    if isinstance(body, FileWrapper):
+        body.buffer_size = 1 << 20
+    return resp
+
 # ---- preview signing helpers (for public inline preview) ----
 def _preview_secret() -> bytes:
     return (current_app.config.get("PREVIEW_SECRET") or "change-me").encode()
@@ -93,18 +338,28 @@ def _preview_secret() -> bytes:
 def _preview_ttl() -> int:
     return int(current_app.config.get("PREVIEW_TTL", 300))
 
+# secret -> HMAC-SHA256 already keyed with it; copy() reuses the padded inner/outer state
+_HMAC_TEMPLATES: dict[bytes, "hmac.HMAC"] = {}
+
+def _preview_sig(msg: bytes) -> str:
+    secret = _preview_secret()
+    tpl = _HMAC_TEMPLATES.get(secret)
+    if tpl is None:
+        tpl = _HMAC_TEMPLATES[secret] = hmac.new(secret, None, hashlib.sha256)
+    h = tpl.copy()
+    h.update(msg)
+    return base64.urlsafe_b64encode(h.digest()).decode().rstrip("=")
+
 def _sign_public_url(abs_path_no_query: str, ttl_sec: int | None = None) -> str:
     exp = int(time.time()) + int(ttl_sec or _preview_ttl())
-    msg = f"{abs_path_no_query}|{exp}".encode()
-    sig = base64.urlsafe_b64encode(hmac.new(_preview_secret(), msg, hashlib.sha256).digest()).decode().rstrip("=")
+    sig = _preview_sig(f"{abs_path_no_query}|{exp}".encode())
     return f"{abs_path_no_query}?exp={exp}&sig={sig}"
 
 def _validate_sig(base_url_no_query: str, exp: int, sig: str) -> bool:
     try:
         if exp < int(time.time()):
             return False
-        msg = f"{base_url_no_query}|{exp}".encode()
-        want = base64.urlsafe_b64encode(hmac.new(_preview_secret(), msg, hashlib.sha256).digest()).decode().rstrip("=")
+        want = _preview_sig(f"{base_url_no_query}|{exp}".encode())
         return hmac.compare_digest(want, sig or "")
     except Exception:
         return False
@@ -171,24 +426,28 @@ def upload():
     if not files:
         abort(400, "No files uploaded")
 
+    owner_id = None if scope == "shared" else (uid if isinstance(uid, int) else None)
     created = []
     for f in files:
         fn = _ensure_safe_name(f.filename)
-        dest = os.path.join(root, fn)
-        os.makedirs(os.path.dirname(dest), exist_ok=True)
-        f.save(dest)
+        dest = os.path.join(root, fn)  # root exists: _root_dir creates it, parents are on disk
+        crc, size = _store_upload(f.stream, dest)
+        mtime_ns = os.stat(dest).st_mtime_ns if crc is not None else None
 
-        node = FileNode(
-            owner_id=None if scope == "shared" else (uid if isinstance(uid, int) else None),
+        created.append(FileNode(
+            owner_id=owner_id,
             scope=scope,
             name=fn,
             type="file",
             parent_id=parent.id if parent else None,
             path=dest,
-        )
-        db.session.add(node)
-        created.append(node)
+            crc32=crc,
+            size=size,
+            mtime_ns=mtime_ns,
+            mime_type=mimetypes.guess_type(fn)[0],
+        ))
 
+    db.session.add_all(created)
     db.session.commit()
     return jsonify([n.to_dict() for n in created]), 201
 
@@ -208,6 +467,8 @@ def rename():
     os.rename(node.path, new_path)
     node.name = new_name
     node.path = new_path
+    if node.type == "file":
+        node.mime_type = mimetypes.guess_type(new_name)[0]
     db.session.commit()
     return jsonify(node.to_dict())
 
@@ -256,24 +517,15 @@ def download(node_id):
         abort(403)
 
     if node.type == "file":
-        mime, _ = mimetypes.guess_type(node.name)
-        return send_file(
+        return _send_path(
             node.path,
             as_attachment=True,
             download_name=node.name,
-            mimetype=mime or "application/octet-stream",
+            mimetype=_node_mime(node),
+            conditional=True,
         )
 
-    mem = io.BytesIO()
-    with ZipFile(mem, "w", ZIP_DEFLATED) as zf:
-        base_dir = node.path
-        for root, _, files in os.walk(base_dir):
-            for f in files:
-                abs_path = os.path.join(root, f)
-                arcname = os.path.relpath(abs_path, start=os.path.dirname(base_dir))
-                zf.write(abs_path, arcname=arcname)
-    mem.seek(0)
-    return send_file(mem, as_attachment=True, download_name=f"{node.name}.zip", mimetype="application/zip")
+    return _zip_response(node.path, f"{node.name}.zip")
 
 @files_bp.get("/download-all")
 @login_required
@@ -283,15 +535,7 @@ def download_all():
     uid = _current_user_id()
 
     root = _root_dir(scope, uid)
-    mem = io.BytesIO()
-    with ZipFile(mem, "w", ZIP_DEFLATED) as zf:
-        for base, _, files in os.walk(root):
-            for f in files:
-                abs_path = os.path.join(base, f)
-                arcname = os.path.relpath(abs_path, start=os.path.dirname(root))
-                zf.write(abs_path, arcname=arcname)
-    mem.seek(0)
-    return send_file(mem, as_attachment=True, download_name=f"{scope}-files.zip", mimetype="application/zip")
+    return _zip_response(root, f"{scope}-files.zip")
 
 # ─────────────────────────────────────────────────────────────
 # NEW: Signed preview URL + public inline download
@@ -329,12 +573,11 @@ def public_download_file(node_id: int):
     if node.type != "file":
         abort(400, "Folders cannot be previewed.")
 
-    mime, _ = mimetypes.guess_type(node.name)
-    return send_file(
+    return _send_path(
         node.path,
         as_attachment=False,
         download_name=node.name,
-        mimetype=mime or "application/octet-stream",
+        mimetype=_node_mime(node),
         max_age=_preview_ttl(),
         conditional=True,
         etag=True,
@@ -449,7 +692,11 @@ def copy_node():
                 duplicate_tree(child, dst.id, new_path)
             return dst
         else:
+            src_st = os.stat(src_node.path)
             shutil.copy2(src_node.path, new_path)
+            # carry the CRC over only if the source is still the file it was computed from
+            crc_ok = (src_node.crc32 is not None and src_node.size == src_st.st_size
+                      and src_node.mtime_ns == src_st.st_mtime_ns)
             dst = FileNode(
                 owner_id=src_node.owner_id,
                 scope=src_node.scope,
@@ -458,6 +705,10 @@ def copy_node():
                 parent_id=parent_id,
                 path=new_path,
                 permission=src_node.permission,
+                crc32=src_node.crc32 if crc_ok else None,
+                size=src_node.size,
+                mtime_ns=os.stat(new_path).st_mtime_ns if crc_ok else None,
+                mime_type=src_node.mime_type,
             )
             db.session.add(dst)
             return dst
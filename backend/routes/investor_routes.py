@@ -1,10 +1,20 @@
 # routes/investor_routes.py
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from backend.models import Record, User
+from backend.models import Record, User, Q4ReportRow
 from backend.extensions import db
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from flask_login import login_required
-import pandas as pd
+import math
+import os
+
+# Optional Rust XLSX/XLSM reader; the Q4 sheet is read without building a DataFrame when present
+try:
+    from python_calamine import CalamineWorkbook  # type: ignore
+except Exception:  # pragma: no cover
+    CalamineWorkbook = None
 
 investor_bp = Blueprint('investor', __name__)
 
@@ -22,10 +32,16 @@ def get_dashboard():
     if not user:
         return jsonify({"msg": "User not found"}), 404
 
-    records = Record.query.filter_by(investor_id=user.id).all()
-    investment = sum(r.amount for r in records if r.type == 'investment')
-    expense = sum(r.amount for r in records if r.type == 'expense')
-    profit = sum(r.amount for r in records if r.type == 'profit')
+    # one grouped SUM in the DB instead of hydrating every Record and summing in Python
+    totals = dict(
+        db.session.query(Record.type, func.sum(Record.amount))
+        .filter(Record.investor_id == user.id)
+        .group_by(Record.type)
+        .all()
+    )
+    investment = totals.get('investment') or 0
+    expense = totals.get('expense') or 0
+    profit = totals.get('profit') or 0
     balance = investment + profit - expense
 
     return jsonify({
@@ -37,7 +53,7 @@ def get_dashboard():
         "investmentType": None,
         "bankName": user.bank,
         "status": user.status
-    }), 200
+    })
 
 
 from sqlalchemy import text
@@ -46,6 +62,102 @@ from backend.excel_db import excel_engine
 EXCEL_FILE_PATH = "uploads/Elpis_-_CAS_v.08_-_2025_Q1_PCAP_1.xlsm"
 TARGET_SHEET = "bcas_q4_adj"  # adjust to match your sheet/tab name
 
+# sheet header -> Q4ReportRow column
+Q4_COLUMNS = {
+    "Ending Balance": "ending_balance",
+    "Unrealized Gain/Loss": "unrealized",
+    "Management Fee": "mgmt_fee",
+    "Committed": "committed",
+}
+
+# workbook mtime this process last confirmed q4_report_rows matches
+_Q4_SYNCED = {"mtime": None}
+
+Q4_HEADER_ROW = 9  # 0-based row holding the column headers
+
+def _q4_read_calamine() -> dict:
+    """Name Match -> {field: value} straight from calamine's cell rows (no DataFrame)."""
+    rows = (CalamineWorkbook.from_path(EXCEL_FILE_PATH)
+            .get_sheet_by_name(TARGET_SHEET)
+            .to_python(skip_empty_area=False))
+    header = [c.strip() if isinstance(c, str) else c for c in rows[Q4_HEADER_ROW]]
+    name_idx = header.index('Name Match')
+    cols = [(f, header.index(f)) for f in Q4_COLUMNS if f in header]
+    by_name = {}
+    for row in rows[Q4_HEADER_ROW + 1:]:
+        raw = row[name_idx] if name_idx < len(row) else ""
+        name = str(raw if raw != "" else "nan").strip().lower()  # blank reads as "nan", like astype(str)
+        if name not in by_name:
+            by_name[name] = {f: (row[j] if j < len(row) and row[j] != "" else None) for f, j in cols}
+    return by_name
+
+def _q4_read_pandas() -> dict:
+    import pandas as pd  # only on the no-calamine ingest path; keeps pandas out of the request path
+
+    df = pd.read_excel(EXCEL_FILE_PATH, sheet_name=TARGET_SHEET, header=Q4_HEADER_ROW)
+
+    # Normalize column names and the "Name Match" key; first row per name wins, as before
+    df.columns = df.columns.str.strip()
+    names = df['Name Match'].astype(str).str.strip().str.lower()
+    cols = [c for c in Q4_COLUMNS if c in df.columns]
+    by_name = {}
+    for name, rec in zip(names, df[cols].to_dict("records")):
+        by_name.setdefault(name, rec)
+    return by_name
+
+def _q4_num(v):
+    if isinstance(v, bool) or not isinstance(v, (int, float)):
+        try:
+            v = float(str(v).replace(",", "")) if v not in (None, "") else None
+        except ValueError:
+            return None
+    return None if v is None or math.isnan(v) else float(v)
+
+def _dialect_insert():
+    name = (db.engine.name or "").lower()
+    return pg_insert if "postgre" in name else sqlite_insert
+
+_Q4_NAME_MAX = Q4ReportRow.__table__.c.name_match.type.length
+
+def _q4_ingest(mtime: int) -> None:
+    """
+    Bring q4_report_rows in line with the workbook's current contents. Idempotent: rows are
+    upserted on name_match and then rows from other workbook versions are deleted, so two
+    workers ingesting the same mtime concurrently converge instead of colliding.
+    """
+    by_name = _q4_read_calamine() if CalamineWorkbook is not None else _q4_read_pandas()
+    mappings = []
+    for name, rec in by_name.items():
+        if len(name) > _Q4_NAME_MAX:
+            # truncating could merge two distinct names into one primary key
+            current_app.logger.warning("q4 ingest: skipping name longer than %d chars: %r", _Q4_NAME_MAX, name)
+            continue
+        mappings.append({"name_match": name, "source_mtime": mtime,
+                         **{col: _q4_num(rec.get(field)) for field, col in Q4_COLUMNS.items()}})
+    insert_fn = _dialect_insert()
+    for i in range(0, len(mappings), 500):  # stay under SQLite's bound-parameter limit
+        stmt = insert_fn(Q4ReportRow).values(mappings[i:i + 500])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["name_match"],
+            set_={c: stmt.excluded[c] for c in ("source_mtime", *Q4_COLUMNS.values())},
+        )
+        db.session.execute(stmt)
+    Q4ReportRow.query.filter(Q4ReportRow.source_mtime != mtime).delete(synchronize_session=False)
+    db.session.commit()
+
+def _q4_ensure_synced() -> None:
+    """Re-ingest only when the workbook changed since the last ingest (checked once per mtime per process)."""
+    mtime = os.stat(EXCEL_FILE_PATH).st_mtime_ns
+    if _Q4_SYNCED["mtime"] == mtime:
+        return
+    try:
+        if db.session.query(func.max(Q4ReportRow.source_mtime)).scalar() != mtime:
+            _q4_ingest(mtime)
+    except Exception:
+        db.session.rollback()
+        raise
+    _Q4_SYNCED["mtime"] = mtime
+
 @investor_bp.route("/dashboard/q4_report", methods=["GET"])
 @login_required
 def investor_q4_report():
@@ -57,29 +169,13 @@ def investor_q4_report():
         user = User.query.get(user_id)
         full_name = f"{user.first_name} {user.last_name}".strip().lower()
 
-        # Read the Excel sheet using pandas
-        df = pd.read_excel(EXCEL_FILE_PATH, sheet_name=TARGET_SHEET, header=9)
-
-        # Normalize column names
-        df.columns = df.columns.str.strip()
-
-        # Normalize "Name Match" column and filter investor row
-        df['Name Match'] = df['Name Match'].astype(str).str.strip().str.lower()
-        investor_row = df[df['Name Match'] == full_name]
-
-        if investor_row.empty:
+        _q4_ensure_synced()
+        row = db.session.get(Q4ReportRow, full_name)
+        if row is None:
             return jsonify({"error": f"No data found for {full_name}"}), 404
 
-        row = investor_row.iloc[0]
-
-        # Extract specific columns (ensure you match Excel headers exactly)
-        report = {
-            "Ending Balance": row.get("Ending Balance"),
-            "Unrealized Gain/Loss": row.get("Unrealized Gain/Loss"),
-            "Management Fee": row.get("Management Fee"),
-            "Committed": row.get("Committed"),
-            # Add other fields if needed
-        }
+        # Keys match the Excel headers, as before
+        report = {field: getattr(row, col) for field, col in Q4_COLUMNS.items()}
 
         return jsonify(report), 200
 
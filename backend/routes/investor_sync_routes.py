@@ -449,7 +449,8 @@ def _sheet_candidates(name: str) -> list[str]:
 # ─────────────────────────────────────────────────────────────────────────────
 # Shared ingest helper (used by both endpoints)
 # ─────────────────────────────────────────────────────────────────────────────
-def _ingest_investor_values(values, sheet_input, drive_id, item_id, source):
+def _ingest_investor_values(values, sheet_input, drive_id, item_id, source, commit=True):
+    # commit=False leaves the writes in the caller's transaction (upload_and_ingest commits once)
     # now expects FOUR series (ending, unrealized, mgmt fees, operating expenses)
     ending_map, unreal_map, fees_map, opex_map = _extract_investor_series(values, sheet_input)
 
@@ -542,7 +543,8 @@ def _ingest_investor_values(values, sheet_input, drive_id, item_id, source):
             if end_val is not None:
                 prev_end = end_val
 
-    db.session.commit()
+    if commit:
+        db.session.commit()
     return jsonify(
         ok=True,
         snapshot_id=snap.id,
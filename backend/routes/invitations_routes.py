@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import base64
+import json
+from datetime import datetime
+
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from sqlalchemy import or_, desc
+from sqlalchemy import and_, or_, desc, func
 
 from backend.extensions import db
 from backend.models import Invitation, Investor, Statement
@@ -21,7 +25,63 @@ except Exception:  # pragma: no cover
 invitations_bp = Blueprint("invitations", __name__, url_prefix="/api")
 
 
-def _resolve_current_balance(investor_id: int | None, investor_name: str | None):
+def _balance_tuple(row, source: str, as_of_attr: str):
+    received_at = getattr(row, "created_at", None)
+    as_of = getattr(row, as_of_attr, None)
+    val = float(row.ending_balance) if row.ending_balance is not None else None
+    return (
+        val,
+        source,
+        received_at.isoformat() if received_at else None,
+        as_of.isoformat() if as_of else None,
+    )
+
+
+def _latest_per(model, key_col, keys, order_by) -> dict:
+    """
+    key -> newest `model` row per key_col value, in one query: DISTINCT ON on Postgres,
+    ROW_NUMBER() = 1 elsewhere.
+    """
+    keys = [k for k in set(keys) if k]
+    if not keys:
+        return {}
+    if "postgre" in (db.engine.name or "").lower():
+        q = (
+            model.query.filter(key_col.in_(keys))
+            .order_by(key_col, *order_by)
+            .distinct(key_col)
+        )
+    else:
+        rn = func.row_number().over(partition_by=key_col, order_by=list(order_by)).label("rn")
+        ranked = db.session.query(model.id.label("id"), rn).filter(key_col.in_(keys)).subquery()
+        q = model.query.join(ranked, model.id == ranked.c.id).filter(ranked.c.rn == 1)
+    return {getattr(row, key_col.key): row for row in q.all()}
+
+
+def _latest_statements(investor_ids) -> dict:
+    """investor_id -> newest Statement (created_at DESC, then period_end DESC)."""
+    return _latest_per(
+        Statement, Statement.investor_id, investor_ids,
+        (desc(Statement.created_at).nullslast(), desc(Statement.period_end).nullslast()),
+    )
+
+
+def _latest_snapshots(names) -> dict:
+    """investor name -> newest InvestorPeriodBalance (created_at DESC, then period_date DESC)."""
+    if InvestorPeriodBalance is None:
+        return {}
+    return _latest_per(
+        InvestorPeriodBalance, InvestorPeriodBalance.investor, names,
+        (desc(InvestorPeriodBalance.created_at).nullslast(), desc(InvestorPeriodBalance.period_date).nullslast()),
+    )
+
+
+def _resolve_current_balance(
+    investor_id: int | None,
+    investor_name: str | None,
+    statements: dict | None = None,
+    snapshots: dict | None = None,
+):
     """
     Return the most recently RECEIVED balance for an investor.
 
@@ -29,56 +89,79 @@ def _resolve_current_balance(investor_id: int | None, investor_name: str | None)
       1) Latest Statement row by created_at DESC (i.e., newest received) then period_end DESC.
       2) Latest InvestorPeriodBalance row by created_at DESC then period_date DESC (snapshot fallback).
 
+    `statements` / `snapshots` are optional prefetched {investor_id: latest Statement} and
+    {name: latest InvestorPeriodBalance} maps (see _prefetch_invitation_context).
+
     Returns: (ending_balance or None, source: 'statement'|'snapshot'|'none',
               balance_received_at_iso, balance_as_of_iso)
     """
     # 1) Preferred: Statements by investor_id (newest row in DB wins)
     if investor_id:
-        st = (
-            Statement.query.filter(Statement.investor_id == investor_id)
-            .order_by(
-                desc(Statement.created_at).nullslast(),
-                desc(Statement.period_end).nullslast(),
+        if statements is not None:
+            st = statements.get(investor_id)
+        else:
+            st = (
+                Statement.query.filter(Statement.investor_id == investor_id)
+                .order_by(
+                    desc(Statement.created_at).nullslast(),
+                    desc(Statement.period_end).nullslast(),
+                )
+                .first()
             )
-            .first()
-        )
         if st:
-            received_at = getattr(st, "created_at", None)
-            as_of = getattr(st, "period_end", None)
-            val = float(st.ending_balance) if st.ending_balance is not None else None
-            return (
-                val,
-                "statement",
-                received_at.isoformat() if received_at else None,
-                as_of.isoformat() if as_of else None,
-            )
+            return _balance_tuple(st, "statement", "period_end")
 
     # 2) Fallback: Snapshot by investor name (newest row in DB wins)
     if investor_name and InvestorPeriodBalance is not None:
-        row = (
-            InvestorPeriodBalance.query.filter(InvestorPeriodBalance.investor == investor_name)
-            .order_by(
-                desc(InvestorPeriodBalance.created_at).nullslast(),
-                desc(InvestorPeriodBalance.period_date).nullslast(),
+        if snapshots is not None:
+            row = snapshots.get(investor_name)
+        else:
+            row = (
+                InvestorPeriodBalance.query.filter(InvestorPeriodBalance.investor == investor_name)
+                .order_by(
+                    desc(InvestorPeriodBalance.created_at).nullslast(),
+                    desc(InvestorPeriodBalance.period_date).nullslast(),
+                )
+                .first()
             )
-            .first()
-        )
         if row:
-            received_at = getattr(row, "created_at", None)
-            as_of = getattr(row, "period_date", None)
-            val = float(row.ending_balance) if row.ending_balance is not None else None
-            return (
-                val,
-                "snapshot",
-                received_at.isoformat() if received_at else None,
-                as_of.isoformat() if as_of else None,
-            )
+            return _balance_tuple(row, "snapshot", "period_date")
 
     return None, "none", None, None
 
 
-def serialize_invitation(inv: Invitation) -> dict:
-    """Serialize an invitation and attach the linked Investor, contact, and current balance."""
+def _prefetch_invitation_context(invitations) -> dict:
+    """
+    Everything serialize_invitation needs for a page, in at most three queries: linked
+    investors, their latest statements, and the latest snapshot rows for the rest.
+    """
+    inv_ids = [i.id for i in invitations]
+    investors: dict = {}
+    if inv_ids:
+        for linked in Investor.query.filter(Investor.invitation_id.in_(inv_ids)).order_by(Investor.id).all():
+            investors.setdefault(linked.invitation_id, linked)
+    statements = _latest_statements(i.id for i in investors.values())
+
+    # snapshot fallback is only consulted when there's no statement for the row
+    names = []
+    for inv in invitations:
+        linked = investors.get(inv.id)
+        if linked is not None and linked.id in statements:
+            continue
+        names.append(getattr(linked, "name", None) if linked else getattr(inv, "name", None))
+    return {
+        "investors": investors,
+        "statements": statements,
+        "snapshots": _latest_snapshots(names),
+    }
+
+
+def serialize_invitation(inv: Invitation, ctx: dict | None = None) -> dict:
+    """
+    Serialize an invitation and attach the linked Investor, contact, and current balance.
+    `ctx` is the page-wide prefetch from _prefetch_invitation_context; without it the
+    linked rows are looked up for this invitation alone.
+    """
     if hasattr(inv, "to_dict"):
         base = inv.to_dict()
     else:
@@ -93,7 +176,10 @@ def serialize_invitation(inv: Invitation) -> dict:
         }
 
     # Attach linked investor (kept compatible with existing frontend)
-    linked = Investor.query.filter_by(invitation_id=inv.id).first()
+    if ctx is not None:
+        linked = ctx["investors"].get(inv.id)
+    else:
+        linked = Investor.query.filter_by(invitation_id=inv.id).first()
     investor_payload = None
     if linked:
         if hasattr(linked, "to_dict"):
@@ -113,7 +199,12 @@ def serialize_invitation(inv: Invitation) -> dict:
     # Compute and attach current balance (no extra route)
     inv_id = getattr(linked, "id", None) if linked else None
     inv_name = getattr(linked, "name", None) if linked else base.get("name")
-    current_balance, source, received_at, as_of = _resolve_current_balance(inv_id, inv_name)
+    current_balance, source, received_at, as_of = _resolve_current_balance(
+        inv_id,
+        inv_name,
+        statements=ctx["statements"] if ctx is not None else None,
+        snapshots=ctx["snapshots"] if ctx is not None else None,
+    )
 
     base["current_balance"] = current_balance
     base["balance_source"] = source
@@ -123,6 +214,29 @@ def serialize_invitation(inv: Invitation) -> dict:
     return base
 
 
+def _encode_cursor(order_val, row_id: int) -> str:
+    raw = json.dumps([order_val.isoformat() if order_val else None, int(row_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str):
+    """(order value or None, id) from _encode_cursor; raises ValueError on garbage."""
+    try:
+        val, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return (datetime.fromisoformat(val) if val else None), int(row_id)
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+
+
+def _after_cursor(order_col, ascending: bool, cur_val, cur_id: int):
+    """Rows strictly after (cur_val, cur_id) in `order_col <dir> NULLS LAST, id <dir>` order."""
+    id_after = Invitation.id > cur_id if ascending else Invitation.id < cur_id
+    if cur_val is None:  # already inside the trailing NULL block
+        return and_(order_col.is_(None), id_after)
+    val_after = order_col > cur_val if ascending else order_col < cur_val
+    return or_(val_after, and_(order_col == cur_val, id_after), order_col.is_(None))
+
+
 # Preflight for fetch/axios
 @invitations_bp.route("/invitations", methods=["OPTIONS"], strict_slashes=False)
 def invitations_options():
@@ -147,7 +261,7 @@ def list_invitations():
 
     query = Invitation.query
     if status:
-        query = query.filter(Invitation.status.ilike(status))
+        query = query.filter(Invitation.status == status)  # stored lowercase (Invitation._normalize_status)
     if q:
         like = f"%{q}%"
         query = query.filter(
@@ -159,30 +273,62 @@ def list_invitations():
         )
 
     order_col = Invitation.created_at if sort == "created_at" else Invitation.used_at
+    sort_name = "created_at" if order_col is Invitation.created_at else "used_at"
+
+    # Keyset mode (opt-in with ?cursor=, empty for the first page): each page is an index
+    # seek on (order_col, id) instead of OFFSET, and COUNT(*) only runs for the first page.
+    if "cursor" in request.args:
+        ascending = order == "asc"
+        total = query.order_by(None).count() if not request.args["cursor"] else None
+        if request.args["cursor"]:
+            try:
+                cur_val, cur_id = _decode_cursor(request.args["cursor"])
+            except ValueError:
+                return jsonify({"error": "Invalid cursor"}), 400
+            query = query.filter(_after_cursor(order_col, ascending, cur_val, cur_id))
+        query = query.order_by(
+            (order_col.asc() if ascending else order_col.desc()).nullslast(),
+            Invitation.id.asc() if ascending else Invitation.id.desc(),
+        )
+        rows = query.limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        ctx = _prefetch_invitation_context(rows)
+        return jsonify(
+            {
+                "items": [serialize_invitation(inv, ctx) for inv in rows],
+                "per_page": per_page,
+                "total": total,
+                "next_cursor": _encode_cursor(getattr(rows[-1], sort_name), rows[-1].id) if has_more else None,
+                "sort": sort_name,
+                "order": order,
+                "status_filter": status,
+                "q": q,
+            }
+        )
+
     query = query.order_by(
         (order_col.asc().nullslast() if order == "asc" else order_col.desc().nullslast()),
-        Invitation.created_at.desc(),
+        Invitation.id.asc() if order == "asc" else Invitation.id.desc(),
     )
 
     paginated = query.paginate(page=page, per_page=per_page, error_out=False)
 
     # Serialize invitations + linked investor + current balance
-    items = [serialize_invitation(inv) for inv in paginated.items]
-
-    return (
-        jsonify(
-            {
-                "items": items,
-                "page": page,
-                "per_page": per_page,
-                "total": paginated.total,
-                "sort": "created_at" if order_col is Invitation.created_at else "used_at",
-                "order": order,
-                "status_filter": status,
-                "q": q,
-            }
-        ),
-        200,
+    ctx = _prefetch_invitation_context(paginated.items)
+    items = [serialize_invitation(inv, ctx) for inv in paginated.items]
+
+    return jsonify(
+        {
+            "items": items,
+            "page": page,
+            "per_page": per_page,
+            "total": paginated.total,
+            "sort": sort_name,
+            "order": order,
+            "status_filter": status,
+            "q": q,
+        }
     )
 
 
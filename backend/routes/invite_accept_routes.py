@@ -1,44 +1,75 @@
 # backend/routes/invite_accept_routes.py — updated for XSRF + login_required + emergency_contact
-from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash
+import hashlib
+from flask import Blueprint, current_app, request, jsonify
 from datetime import datetime
-from flask_login import login_required, current_user
+from sqlalchemy import String, bindparam, exists, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from backend.extensions import db
 from backend.models import Invitation, User, Investor
+from backend.utils.passwords import hash_password
 
 invite_accept_bp = Blueprint("invite_accept", __name__, url_prefix="/admin")
 
+# Statements built once at import; SQLAlchemy's compiled cache is keyed on their shape, so
+# each request only binds parameters. A NULL "e" falls back to the invitation's own email.
+_INV_STMT = select(Invitation).where(Invitation.token == bindparam("tok"))
+_ACCEPT_EMAIL = func.coalesce(bindparam("e", type_=String), func.lower(Invitation.email))
+# The duplicate-account check is an EXISTS (one boolean, served from the email/username
+# indexes) rather than a join that materializes the whole User row
+_ACCEPT_STMT = (
+    select(
+        Invitation,
+        exists()
+        .where(or_(func.lower(User.email) == _ACCEPT_EMAIL, User.username == _ACCEPT_EMAIL))
+        .label("user_exists"),
+    )
+    .where(Invitation.token == bindparam("tok"))
+)
+
+# Investor columns an upsert only overwrites when the new value is non-empty
+_INVESTOR_KEEP_COLS = (
+    "address", "contact_phone", "birthdate", "citizenship", "ssn_tax_id", "emergency_contact",
+    "address1", "address2", "country", "city", "state", "zip",
+)
+
+
+def _dialect_insert():
+    name = (db.engine.name or "").lower()
+    return pg_insert if "postgre" in name else sqlite_insert
+
 # NOTE ON XSRF/CSRF:
 # This blueprint relies on app-wide CSRFProtect (e.g., CSRFProtect(app))
 # which validates the XSRF-TOKEN cookie against the X-XSRF-TOKEN header
 # for unsafe methods (POST/PUT/PATCH/DELETE). No JWT usage remains.
 
 
-def _split_name(full: str):
-    full = (full or "").strip()
-    if not full:
-        return "", ""
-    parts = full.split()
-    if len(parts) == 1:
-        return parts[0], ""
-    return " ".join(parts[:-1]), parts[-1]
-
-
 @invite_accept_bp.get("/invite/<token>")
 def get_invite(token):
-    inv = Invitation.query.filter_by(token=token).first()
+    inv = db.session.execute(_INV_STMT, {"tok": token}).scalar_one_or_none()
     if not inv or inv.status not in ("pending",) or (inv.expires_at and inv.expires_at < datetime.utcnow()):
         return jsonify({"msg": "Invalid or expired link"}), 400
 
-    # return what AcceptInvite needs to prefill
-    return jsonify({
-        "email": inv.email,
-        "name": inv.name,
-        "token": inv.token,
-        # include user_type if present on model
-        "user_type": getattr(inv, "user_type", "investor"),
-    }), 200
+    # Weak ETag over everything the body depends on; revisits of AcceptInvite within
+    # max-age are served from the browser cache, later ones revalidate to a 304
+    etag = hashlib.blake2b(
+        f"{inv.id}:{inv.status}:{inv.expires_at}:{inv.email}:{inv.name}".encode(), digest_size=8
+    ).hexdigest()
+    if request.if_none_match.contains_weak(etag):
+        resp = current_app.response_class(status=304)
+    else:
+        # return what AcceptInvite needs to prefill
+        resp = jsonify({
+            "email": inv.email,
+            "name": inv.name,
+            "token": inv.token,
+            # include user_type if present on model
+            "user_type": getattr(inv, "user_type", "investor"),
+        })
+    resp.set_etag(etag, weak=True)
+    resp.headers["Cache-Control"] = "private, max-age=30"
+    return resp
 
 
 @invite_accept_bp.post("/invite/<token>")
@@ -48,12 +79,16 @@ def accept_invite(token):
     and creates/links the User & Investor records.
     Now stores `emergency_contact` as well.
     """
-    inv = Invitation.query.filter_by(token=token).first()
+    data = request.get_json(silent=True) or {}
+
+    # One round-trip for the invite and whether an account already uses the email
+    # (the invitation's own email is the fallback when the body omits one)
+    body_email = (data.get("email") or "").strip().lower()
+    row = db.session.execute(_ACCEPT_STMT, {"tok": token, "e": body_email or None}).first()
+    inv, user_exists = row if row else (None, False)
     if not inv or inv.status not in ("pending",):
         return jsonify({"msg": "Invalid or expired link"}), 400
 
-    data = request.get_json(silent=True) or {}
-
     # Personal Information (required)
     first_name = (data.get("first_name") or "").strip()
     last_name  = (data.get("last_name") or "").strip()
@@ -83,20 +118,16 @@ def accept_invite(token):
         return jsonify({"msg": "First/Last name, email and password are required"}), 400
 
     # Prevent duplicate account
-    if User.query.filter((User.email == email) | (User.username == email)).first():
+    if user_exists:
         return jsonify({"msg": "An account already exists for this email"}), 409
 
     # Compose single address string to fit current schema
-    lines = [address1]
-    if address2:
-        lines.append(address2)
-    locality = ", ".join([p for p in [city, state] if p])
-    endline  = " ".join([p for p in [locality, zip_code] if p]).strip()
-    if country:
-        endline = (endline + (", " if endline else "") + country).strip(", ")
-    if endline:
-        lines.append(endline)
-    composed_address = ", ".join([l for l in lines if l])
+    # ("1 Main St", "Apt 2", "Austin, TX 78701", "US"); every part is already stripped
+    locality = " ".join(p for p in (", ".join(p for p in (city, state) if p), zip_code) if p)
+    composed_address = ", ".join(p for p in (address1, address2, locality, country) if p)
+
+    # Hash before any row is added/flushed so no write lock is held during the CPU burn
+    hashed_pw = hash_password(password)
 
     # Create User (cookie-session login system; password hashed)
     user = User(
@@ -104,7 +135,7 @@ def accept_invite(token):
         last_name  = last_name or "",
         email      = email,
         username   = email,
-        password   = generate_password_hash(password),
+        password   = hashed_pw,
         user_type  = "investor",
         address    = composed_address or None,
         phone      = phone or None,
@@ -114,38 +145,45 @@ def accept_invite(token):
     db.session.add(user)
     db.session.flush()
 
-    # Create/attach Investor
-    investor = Investor.query.filter_by(invitation_id=inv.id).first()
-    if not investor:
-        investor = Investor(
-            name = full_name or email,
-            owner_id = inv.invited_by or user.id,
-            invitation_id = inv.id,
-        )
-        db.session.add(investor)
-
-    investor.name            = full_name or investor.name
-    investor.address         = composed_address or investor.address
-    investor.contact_phone   = phone or investor.contact_phone
-    investor.email           = email
-    investor.account_user_id = user.id
-
-    # Persist extra fields (includes NEW emergency_contact)
-    investor.birthdate         = birthdate or investor.birthdate
-    investor.citizenship       = citizenship or investor.citizenship
-    investor.ssn_tax_id        = ssn_tax_id or investor.ssn_tax_id
-    investor.emergency_contact = emergency_contact or investor.emergency_contact
-
-    investor.address1 = address1 or investor.address1
-    investor.address2 = address2 or investor.address2
-    investor.country  = country  or investor.country
-    investor.city     = city     or investor.city
-    investor.state    = state    or investor.state
-    investor.zip      = zip_code or investor.zip
+    # Create/attach Investor in one INSERT .. ON CONFLICT (invitation_id) DO UPDATE;
+    # empty fields keep whatever the existing row already had
+    now = datetime.utcnow()
+    ins = _dialect_insert()(Investor).values(
+        invitation_id     = inv.id,
+        name              = full_name or email,
+        owner_id          = inv.invited_by or user.id,
+        email             = email,
+        account_user_id   = user.id,
+        address           = composed_address or None,
+        contact_phone     = phone or None,
+        birthdate         = birthdate or None,
+        citizenship       = citizenship or None,
+        ssn_tax_id        = ssn_tax_id or None,
+        emergency_contact = emergency_contact or None,
+        address1          = address1 or None,
+        address2          = address2 or None,
+        country           = country or None,
+        city              = city or None,
+        state             = state or None,
+        zip               = zip_code or None,
+        created_at        = now,
+        updated_at        = now,
+    )
+    cols = Investor.__table__.c
+    set_ = {c: func.coalesce(ins.excluded[c], cols[c]) for c in _INVESTOR_KEEP_COLS}
+    set_.update(
+        name=ins.excluded.name,
+        email=ins.excluded.email,
+        account_user_id=ins.excluded.account_user_id,
+        updated_at=ins.excluded.updated_at,
+    )
+    ins = ins.on_conflict_do_update(index_elements=["invitation_id"], set_=set_).returning(Investor)
+    investor = db.session.scalars(ins, execution_options={"populate_existing": True}).one()
 
     # Mark invite used
-    inv.status = "accepted"
-    inv.used_at = datetime.utcnow()
+    db.session.execute(
+        update(Invitation).where(Invitation.id == inv.id).values(status="accepted", used_at=now)
+    )
 
     db.session.commit()
 
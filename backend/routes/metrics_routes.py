@@ -1,17 +1,28 @@
 # routes/metrics_routes.py
 from __future__ import annotations
 
-from flask import Blueprint, jsonify, current_app, request, session as _session
+from flask import Blueprint, jsonify, current_app, request, g, session as _session
 from pathlib import Path
-import logging, os, time, math, re, warnings
+from functools import lru_cache
+from bisect import bisect_left, bisect_right
+import logging, os, time, math, re, warnings, hashlib, threading
 from datetime import datetime, timedelta, date
+from typing import TYPE_CHECKING
 
-import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.utils import get_column_letter
+# pandas / numpy / openpyxl are imported inside the helpers that use them so workers
+# that never serve a workbook route don't pay their import time and memory
+if TYPE_CHECKING:  # annotations only
+    import numpy as np
+    import pandas as pd
 
-from backend.extensions import db
-from sqlalchemy.dialects.sqlite import insert as sqlite_insert  # swap for other DBs
+try:
+    from python_calamine import CalamineWorkbook  # type: ignore
+except Exception:  # pragma: no cover
+    CalamineWorkbook = None
+
+from backend.extensions import db, cache
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy import and_, or_, func
 
 # --- Models
@@ -63,6 +74,14 @@ market_bp  = Blueprint("market",     __name__, url_prefix="/api/market")
 #   Small caches
 # =========================
 _OVERVIEW_CACHE = {}
+_OVERVIEW_CACHE_LOCK = threading.Lock()
+_OVERVIEW_STAT_TTL = 5.0    # skip re-stat'ing the workbook for this long after a check
+_OVERVIEW_CACHE_TTL = 60.0  # entries not checked within this window are evictable
+_OVERVIEW_CACHE_MAX = 256
+_COMPUTE_CACHE = {}
+_COMPUTE_CACHE_LOCK = threading.Lock()
+_COMPUTE_CACHE_TTL = 60.0
+_COMPUTE_CACHE_MAX = 128
 _APP_BEARER_CACHE = {"token": None, "exp": 0, "err_status": None, "err_text": None, "ts": 0}
 
 # =========================
@@ -82,26 +101,33 @@ def _cfg(key: str, default=None):
 # =========================
 #   Path helpers
 # =========================
+_NORM_RE = re.compile(r"[ \-_.()]+")
+
 def _norm(s: str) -> str:
-    return re.sub(r"[ \-_.()]+", "", s or "").lower()
+    return _NORM_RE.sub("", s or "").lower()
 
 def _uploads_dir() -> Path:
     """
     Prefer UPLOAD_ROOT (from app.py), then common fallbacks.
     """
-    root = Path(current_app.root_path)
+    return _uploads_dir_cached(
+        current_app.root_path, _cfg("UPLOAD_ROOT"), current_app.config.get("UPLOAD_FOLDER"), os.getcwd()
+    )
+
+@lru_cache(maxsize=8)
+def _uploads_dir_cached(root_path: str, up_root: str | None, up_folder: str | None, cwd: str) -> Path:
+    # mkdir/exists over five candidates only once per (config, cwd) instead of per request
+    root = Path(root_path)
     candidates = []
-    up_root = _cfg("UPLOAD_ROOT")
     if up_root:
         candidates.append(Path(up_root))
-    up_folder = current_app.config.get("UPLOAD_FOLDER")
     if up_folder:
         p = Path(up_folder)
         candidates.append(p if p.is_absolute() else (root / p))
     candidates += [
         root / "uploads",
         root.parent / "uploads",
-        Path.cwd() / "uploads",
+        Path(cwd) / "uploads",
         root / "static" / "uploads",
     ]
     for c in candidates:
@@ -135,11 +161,28 @@ def _find_best_xlsm(uploads: Path, filename: str | None) -> Path:
     elpis = [f for f in files if f.name.lower().startswith("elpis")]
     return (elpis[0] if elpis else files[0]).resolve()
 
+_DISCOVER_CACHE: dict = {}
+_DISCOVER_TTL = 60.0
+
 def _discover_xlsm(file: str | None, path: str | None):
     """
     Strong discovery for local .xlsm.
     Returns (Path, searched_dirs[list[str]])
     """
+    # The globs below re-list up to five directories; reuse a pick for a short while as long
+    # as the file is still there (new uploads are picked up once the entry ages out)
+    key = (current_app.root_path, os.getcwd(), file, path, _cfg("DEFAULT_WORKBOOK_FILE"))
+    now = time.monotonic()
+    hit = _DISCOVER_CACHE.get(key)
+    if hit and now - hit[0] < _DISCOVER_TTL and hit[1].is_file():
+        return hit[1], list(hit[2])
+    found, searched = _discover_xlsm_uncached(file, path)
+    if len(_DISCOVER_CACHE) >= 64:
+        _DISCOVER_CACHE.clear()
+    _DISCOVER_CACHE[key] = (now, found, tuple(searched))
+    return found, searched
+
+def _discover_xlsm_uncached(file: str | None, path: str | None):
     searched = []
 
     if path:
@@ -188,6 +231,16 @@ def _discover_xlsm(file: str | None, path: str | None):
 def _app_token_last_error():
     return _APP_BEARER_CACHE.get("err_status"), _APP_BEARER_CACHE.get("err_text"), _APP_BEARER_CACHE.get("ts")
 
+_HTTP = {}
+
+def _http_session():
+    """One requests.Session per worker so token refreshes reuse the TCP/TLS connection."""
+    sess = _HTTP.get("session")
+    if sess is None:
+        import requests
+        sess = _HTTP["session"] = requests.Session()
+    return sess
+
 def _get_app_bearer() -> str | None:
     """
     Client-credentials token with one-shot Conditional Access claims retry.
@@ -209,12 +262,42 @@ def _get_app_bearer() -> str | None:
         _APP_BEARER_CACHE.update({"err_status": "config_missing", "err_text": "Missing AZURE_TENANT_ID/CLIENT_ID/CLIENT_SECRET", "ts": now})
         return None
 
+    # Shared cache first (Redis across gunicorn workers/restarts); one worker refreshes
+    # while the others wait briefly for its token instead of all hitting the IdP
+    key = f"ms_app_token:{tenant}:{cid}"
+    lock_key = key + ":lock"
+    have_lock = False
+    if cache is not None:
+        try:
+            hit = cache.get(key)
+            if not hit:
+                have_lock = bool(cache.add(lock_key, 1, timeout=15))
+                if not have_lock:
+                    deadline = now + 5
+                    while not hit and time.time() < deadline:
+                        time.sleep(0.1)
+                        hit = cache.get(key)
+            if hit:
+                _APP_BEARER_CACHE.update({"token": hit["token"], "exp": hit["exp"], "err_status": None, "err_text": None, "ts": now})
+                return hit["token"]
+        except Exception:
+            pass
+
+    try:
+        return _fetch_app_bearer(key, tenant, cid, secret, scope, now)
+    finally:
+        if have_lock:
+            try:
+                cache.delete(lock_key)
+            except Exception:
+                pass
+
+def _fetch_app_bearer(key: str, tenant: str, cid: str, secret: str, scope: str, now: float) -> str | None:
     url = f"https://login.microsoftonline.com/{tenant}/oauth2/v2.0/token"
     base = {"client_id": cid, "client_secret": secret, "grant_type": "client_credentials", "scope": scope}
     try:
         def _post(payload):
-            import requests
-            return requests.post(url, data=payload, timeout=15)
+            return _http_session().post(url, data=payload, timeout=15)
 
         resp = _post(base)
 
@@ -238,6 +321,11 @@ def _get_app_bearer() -> str | None:
         exp = now + int(j.get("expires_in", 3600))
         if tok:
             _APP_BEARER_CACHE.update({"token": tok, "exp": exp, "err_status": None, "err_text": None, "ts": now})
+            if cache is not None:
+                try:
+                    cache.set(key, {"token": tok, "exp": exp}, timeout=max(int(exp - now) - 60, 1))
+                except Exception:
+                    pass
             return tok
         _APP_BEARER_CACHE.update({"err_status": "no_token", "err_text": str(j)[:800], "ts": now})
         return None
@@ -274,6 +362,8 @@ def _unauthorized_response_no_bearer(context_hint: str, searched_uploads: str |
 #   Sheet name helpers
 # =========================
 _WS_NORMALIZE_RE = re.compile(r"[\s\u00A0\-\_\.\(\)\[\]\{\}\\+]+", re.UNICODE)
+_SHEET_PAREN_RE = re.compile(r"\s*\(")
+_WS_SPACE_RE = re.compile(r"\s+")
 def _normalize_sheet_name(s: str) -> str:
     s = (s or "").strip().replace("\u00A0", " ")
     return _WS_NORMALIZE_RE.sub("", s).lower()
@@ -283,8 +373,8 @@ def _sheet_candidates(name: str) -> list[str]:
     variants = {
         base,
         base.replace("(", " (").replace("  ", " ").strip(),
-        re.sub(r"\s*\(", " (", base).strip(),
-        re.sub(r"\s+", "", base),
+        _SHEET_PAREN_RE.sub(" (", base).strip(),
+        _WS_SPACE_RE.sub("", base),
         base.replace("+", " "),
     } if base else set()
     return [v for v in variants if v]
@@ -317,6 +407,11 @@ def _resolve_remote_sheet_name(drive_id: str, item_id: str, wanted: str, bearer:
 # =========================
 #   Value / date helpers
 # =========================
+# vectorized money cleanup (_coerce_money_series); the scalar _to_float keeps plain
+# str.replace/startswith, which is faster than regex per cell
+_MONEY_STRIP_RE = re.compile(r"[,$]")
+_PAREN_NEG_RE = re.compile(r"^\((.*)\)$")
+
 def _to_float(v):
     if v in (None, "", "—", "-", "–"):
         return math.nan
@@ -328,9 +423,34 @@ def _to_float(v):
     except Exception:
         return math.nan
 
+def _coerce_money_series(col):
+    """
+    Vectorized money coercion for a pandas Series: numbers pass straight through,
+    strings lose ',' / '$' and '(x)' becomes -x; anything else is NaN.
+    """
+    import pandas as pd
+    if pd.api.types.is_numeric_dtype(col):
+        return pd.to_numeric(col, errors="coerce")
+    num = pd.to_numeric(col, errors="coerce")
+    todo = num.isna() & col.notna()
+    if todo.any():
+        s = col[todo].astype(str).str.strip()
+        s = s.str.replace(_MONEY_STRIP_RE, "", regex=True)
+        s = s.str.replace(_PAREN_NEG_RE, r"-\1", regex=True).str.strip()
+        num = num.astype(float)
+        num[todo] = pd.to_numeric(s, errors="coerce")
+    return num.astype(float)
+
+def _to_float_series(values) -> np.ndarray:
+    """Vectorized `_to_float` over a sequence of cells: float64 array, NaN where unparseable."""
+    import pandas as pd
+    return _coerce_money_series(pd.Series(values, dtype=object)).to_numpy(dtype=float)
+
 def _parse_excel_date(val):
     if isinstance(val, datetime):
         return val
+    if isinstance(val, date):  # calamine returns date-only cells as date
+        return datetime(val.year, val.month, val.day)
     if isinstance(val, (int, float)):
         if 20000 < float(val) < 90000:
             try:
@@ -338,24 +458,32 @@ def _parse_excel_date(val):
             except Exception:
                 pass
     if isinstance(val, str):
-        s = val.strip()
-        for fmt in ("%m/%d/%Y", "%d/%m/%Y", "%Y-%m-%d", "%m/%d/%y", "%d-%b-%Y"):
-            try:
-                return datetime.strptime(s, fmt)
-            except Exception:
-                continue
+        return _parse_date_str(val.strip())
+    return None
+
+@lru_cache(maxsize=8192)
+def _parse_date_str(s: str):
+    # Sheets repeat the same handful of date strings down whole columns; strptime
+    # through five formats per cell is the cost, so results are memoized per string
+    for fmt in ("%m/%d/%Y", "%d/%m/%Y", "%Y-%m-%d", "%m/%d/%y", "%d-%b-%Y"):
+        try:
+            return datetime.strptime(s, fmt)
+        except Exception:
+            continue
     return None
 
+_SANE_DATE_LO = datetime(2000, 1, 1)
+
 def _is_sane_date(dt: datetime | None) -> bool:
     if not dt:
         return False
-    lo = datetime(2000, 1, 1)
-    hi = datetime.utcnow() + timedelta(days=31)
-    return lo <= dt <= hi
+    return _SANE_DATE_LO <= dt <= datetime.utcnow() + timedelta(days=31)
+
+_NORMHDR_RE = re.compile(r"[^a-z0-9]+")
 
 def _normhdr(x: str) -> str:
     s = (x or "").lower().replace("\u00a0", " ").replace("\u2011", "-")
-    return re.sub(r"[^a-z0-9]+", "", s)
+    return _NORMHDR_RE.sub("", s)
 
 _DATE_ALIASES_N = (
     "asofdate", "asof", "date", "period", "month",
@@ -366,85 +494,131 @@ _BEGIN_ALIASES_N  = (
     "currentperiodbegbalance", "currentperiodbeginningbalance",
     "beginningbalance", "openingbalance", "openingnav"
 )
+# One alternation per alias set: a single C-level scan per header cell instead of a
+# Python-level `alias in t` loop over every alias
+_DATE_ALIAS_RE   = re.compile("|".join(map(re.escape, _DATE_ALIASES_N)))
+_ENDING_ALIAS_RE = re.compile("|".join(map(re.escape, _ENDING_ALIASES_N)))
+_BEGIN_ALIAS_RE  = re.compile("|".join(map(re.escape, _BEGIN_ALIASES_N)))
 
 # =========================
-#   Openpyxl scan helpers
+#   Workbook scan helpers
 # =========================
-def _row_texts(ws, r, max_col):
-    out = []
-    for c in range(1, max_col + 1):
-        v = ws.cell(row=r, column=c).value
-        out.append("" if v is None else str(v).strip().lower())
+# The uploads scan works on a sheet materialized once as rows of plain values
+# (`_read_sheet_rows`), never on Cell objects: ws.cell() in read-only mode re-walks the
+# sheet XML on every call.
+def _pick_sheet(sheetnames, sheet_name: str) -> str:
+    if sheet_name in sheetnames:
+        return sheet_name
+    # simple normalization pass
+    want = _normalize_sheet_name(sheet_name)
+    for s in sheetnames:
+        if _normalize_sheet_name(s) == want or want in _normalize_sheet_name(s):
+            return s
+    return sheet_name
+
+def _read_sheet_rows(path, sheet_name: str):
+    """
+    (resolved sheet name, rows) for one worksheet's cached values. Uses python-calamine
+    (Rust reader) when installed, otherwise openpyxl read-only; empty cells are None
+    either way.
+    """
+    if CalamineWorkbook is not None:
+        try:
+            cwb = CalamineWorkbook.from_path(str(path))
+            target = _pick_sheet(list(cwb.sheet_names), sheet_name)
+            rows = cwb.get_sheet_by_name(target).to_python(skip_empty_area=False)
+            for row in rows:
+                for j, c in enumerate(row):
+                    if c == "":
+                        row[j] = None
+            return target, rows
+        except Exception:
+            pass  # fall back to openpyxl below
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        target = _pick_sheet(wb.sheetnames, sheet_name)
+        return target, list(wb[target].iter_rows(values_only=True))
+    finally:
+        try: wb.close()
+        except Exception: pass
+
+def _col_letter(c: int) -> str:
+    from openpyxl.utils import get_column_letter
+    return get_column_letter(c)
+
+def _at(row, c: int):
+    """1-based column lookup on a row of values (None past the end)."""
+    return row[c - 1] if 0 < c <= len(row) else None
+
+def _row_texts(row, max_col: int):
+    out = ["" if v is None else str(v).strip().lower() for v in row[:max_col]]
+    out.extend([""] * (max_col - len(out)))
     return out
 
-def _scan_total_row_uploads(ws, start_row: int, max_scan_rows: int = 150, label_cols: int = 12) -> int | None:
-    end_row = min(ws.max_row, start_row + max_scan_rows)
+def _scan_total_row_uploads(rows: list, start_row: int, max_scan_rows: int = 150, label_cols: int = 12) -> int | None:
+    end_row = min(len(rows), start_row + max_scan_rows)
     for r in range(start_row, end_row + 1):
-        for c in range(1, min(label_cols, ws.max_column) + 1):
-            v = ws.cell(row=r, column=c).value
+        for v in rows[r - 1][:label_cols]:
             if isinstance(v, str) and "total" in v.lower():
                 return r
     return None
 
-def _sum_contiguous_block_uploads(ws, start_row: int, col: int, blank_run_stop: int = 3) -> float:
-    blanks = 0
-    total = 0.0
-    r = start_row
-    while r <= ws.max_row:
-        v = ws.cell(row=r, column=col).value
-        num = _to_float(v)
-        if math.isnan(num):
-            blanks += 1
-            if blanks >= blank_run_stop:
-                break
-        else:
-            blanks = 0
-            total += float(num)
-        r += 1
-    return float(total)
+def _sum_contiguous_block_uploads(rows: list, start_row: int, col: int, blank_run_stop: int = 3) -> float:
+    import numpy as np
+    # Parse the column slice vectorized, then stop at the first run of
+    # `blank_run_stop` unparseable cells
+    cells = [_at(row, col) for row in rows[max(start_row - 1, 0):]]
+    if not cells:
+        return 0.0
+    nums = _to_float_series(cells)
+    blank = np.isnan(nums)
+    if blank_run_stop > 0 and len(blank) >= blank_run_stop:
+        runs = np.convolve(blank.astype(np.int32), np.ones(blank_run_stop, dtype=np.int32), "valid")
+        hits = np.flatnonzero(runs >= blank_run_stop)
+        if hits.size:
+            nums = nums[: hits[0]]
+    return float(np.nansum(nums))
 
 # =========================
 #   Header/column detection
 # =========================
-def _find_header_row_and_cols(ws, max_scan_rows=None, max_scan_cols=None):
-    max_scan_rows = ws.max_row if max_scan_rows is None else min(max_scan_rows, ws.max_row)
-    max_scan_cols = ws.max_column if max_scan_cols is None else min(max_scan_cols, ws.max_column)
+def _find_header_row_and_cols(rows: list, max_scan_rows=None, max_scan_cols=None):
+    n_cols = max((len(row) for row in rows), default=0)
+    max_scan_rows = len(rows) if max_scan_rows is None else min(max_scan_rows, len(rows))
+    max_scan_cols = n_cols if max_scan_cols is None else min(max_scan_cols, n_cols)
 
     asof_row = asof_col = None
     beg_row, end_row = None, None
     beg_cols, end_cols = [], []
 
-    scan_ranges = [(1, min(max_scan_rows, 50))]
-    if max_scan_rows > 50:
-        scan_ranges.append((51, max_scan_rows))
-
-    for start_r, stop_r in scan_ranges:
-        for r in range(start_r, stop_r + 1):
-            raw = _row_texts(ws, r, max_scan_cols)
-            texts = [_normhdr(v) for v in raw]
-
-            if asof_col is None:
-                for i, t in enumerate(texts):
-                    if any(alias in t for alias in _DATE_ALIASES_N):
-                        asof_row, asof_col = r, i + 1
-                        break
+    for r, row in enumerate(rows[:max_scan_rows], start=1):
+        texts = [_normhdr(v) for v in _row_texts(row, max_scan_cols)]
 
+        if asof_col is None:
             for i, t in enumerate(texts):
-                if any(alias in t for alias in _ENDING_ALIASES_N):
-                    end_row = r
-                    end_cols.append(i + 1)
+                if _DATE_ALIAS_RE.search(t):
+                    asof_row, asof_col = r, i + 1
+                    break
 
-            for i, t in enumerate(texts):
-                if any(alias in t for alias in _BEGIN_ALIASES_N):
-                    beg_row = r
-                    beg_cols.append(i + 1)
+        for i, t in enumerate(texts):
+            if _ENDING_ALIAS_RE.search(t):
+                end_row = r
+                end_cols.append(i + 1)
 
-            if end_cols and asof_col:
-                return (asof_row, asof_col, beg_row, beg_cols, end_row, end_cols)
+        for i, t in enumerate(texts):
+            if _BEGIN_ALIAS_RE.search(t):
+                beg_row = r
+                beg_cols.append(i + 1)
+
+        if end_cols and asof_col:
+            return (asof_row, asof_col, beg_row, beg_cols, end_row, end_cols)
 
     return (asof_row, asof_col, beg_row, beg_cols, end_row, end_cols)
 
 def _coerce_dates_series(col: pd.Series) -> pd.Series:
+    import pandas as pd
     out = pd.Series(pd.NaT, index=col.index, dtype="datetime64[ns]")
 
     # Excel serials
@@ -454,17 +628,17 @@ def _coerce_dates_series(col: pd.Series) -> pd.Series:
         parsed = pd.to_datetime(n.loc[mask_num], unit="D", origin="1899-12-30", errors="coerce")
         out.loc[mask_num] = parsed
 
-    # Strings + generic parse
+    # Strings + generic parse (a numeric column has no strings: skip stringifying it)
     rest_idx = (~mask_num) | mask_num.isna()
-    if rest_idx.any():
+    if rest_idx.any() and not pd.api.types.is_numeric_dtype(col):
         rest = col[rest_idx]
         rest = rest.astype(str).str.strip().replace({"": None, "nan": None})
-        for fmt in ("%m/%d/%Y", "%Y-%m-%d", "%m/%d/%y", "%d/%m/%Y", "%d-%b-%Y"):
-            parsed = pd.to_datetime(rest, format=fmt, errors="coerce")
-            out = out.combine_first(parsed)
+        # exact US pass first (the common case, and it settles mm/dd vs dd/mm), then one
+        # per-element "mixed" pass for everything else instead of a pass per format
+        out = out.combine_first(pd.to_datetime(rest, format="%m/%d/%Y", errors="coerce"))
         with warnings.catch_warnings():
             warnings.simplefilter("ignore", category=UserWarning)
-            parsed_generic = pd.to_datetime(rest, errors="coerce")
+            parsed_generic = pd.to_datetime(rest, format="mixed", errors="coerce", cache=True)
         out = out.combine_first(parsed_generic)
 
     # Sanity filter
@@ -476,14 +650,20 @@ def _coerce_dates_series(col: pd.Series) -> pd.Series:
 # =========================
 #   Period helpers
 # =========================
+def _last_in_range(sorted_dates: list[datetime], lo: datetime, hi: datetime):
+    """Latest date in [lo, hi), or None; O(log N) over an ascending list."""
+    d = _last_before(sorted_dates, hi)
+    return d if d is not None and d >= lo else None
+
 def _coerce_period_end(dN_from_data: datetime, query_val: str | None, dates_for_scan: list[datetime] | None = None, year_qs: str | None = None) -> datetime:
+    # dates_for_scan must be ascending (_bounds_for_basis sorts it)
     if year_qs:
         try:
             y = int(str(year_qs).strip())
             if dates_for_scan:
-                cand = [d for d in dates_for_scan if d.year == y]
-                if cand:
-                    return max(cand)
+                hit = _last_in_range(dates_for_scan, datetime(y, 1, 1), datetime(y + 1, 1, 1))
+                if hit is not None:
+                    return hit
         except Exception:
             pass
 
@@ -493,18 +673,19 @@ def _coerce_period_end(dN_from_data: datetime, query_val: str | None, dates_for_
             try:
                 y, m = int(s[:4]), int(s[5:7])
                 if dates_for_scan:
-                    cand = [d for d in dates_for_scan if d.year == y and d.month == m]
-                    if cand:
-                        return max(cand)
+                    nxt = datetime(y + 1, 1, 1) if m == 12 else datetime(y, m + 1, 1)
+                    hit = _last_in_range(dates_for_scan, datetime(y, m, 1), nxt)
+                    if hit is not None:
+                        return hit
             except Exception:
                 pass
         if len(s) == 4 and s.isdigit():  # YYYY
             try:
                 y = int(s)
                 if dates_for_scan:
-                    cand = [d for d in dates_for_scan if d.year == y]
-                    if cand:
-                        return max(cand)
+                    hit = _last_in_range(dates_for_scan, datetime(y, 1, 1), datetime(y + 1, 1, 1))
+                    if hit is not None:
+                        return hit
             except Exception:
                 pass
         try:
@@ -525,8 +706,9 @@ def _ytd_start(dt: datetime) -> datetime:
 def _bounds_for_basis(dates: list[datetime], basis: str, period_end_qs: str | None, year_qs: str | None = None):
     if not dates:
         return (None, None)
-    d0 = min(dates)
-    dN = max(dates)
+    dates = sorted(dates)  # callers already pass ascending lists, so this is a linear pass
+    d0 = dates[0]
+    dN = dates[-1]
     end = _coerce_period_end(dN, period_end_qs, dates_for_scan=dates, year_qs=year_qs)
     basis = (basis or "inception").lower()
     if basis == "latest":
@@ -545,11 +727,42 @@ def _bounds_for_basis(dates: list[datetime], basis: str, period_end_qs: str | No
         end = dN
     return (start, end)
 
+def _month_index(sorted_dates: list[date]) -> dict:
+    """(year, month) -> that month's dates, ascending; built once per computation."""
+    by_ym = {}
+    for d in sorted_dates:
+        by_ym.setdefault((d.year, d.month), []).append(d)
+    return by_ym
+
+def _prev_ym(d: date) -> tuple[int, int]:
+    return (d.year - 1, 12) if d.month == 1 else (d.year, d.month - 1)
+
+def _last_before(sorted_dates: list[date], d: date):
+    i = bisect_left(sorted_dates, d)
+    return sorted_dates[i - 1] if i else None
+
+def _last_on_or_before(sorted_dates: list[date], d: date):
+    i = bisect_right(sorted_dates, d)
+    return sorted_dates[i - 1] if i else None
+
+def _first_on_or_after(sorted_dates: list[date], d: date):
+    i = bisect_left(sorted_dates, d)
+    return sorted_dates[i] if i < len(sorted_dates) else None
+
+def _to_dt(x) -> datetime:
+    """datetime as-is, date at midnight; only other inputs (strings, numpy) go through pandas."""
+    if isinstance(x, datetime):
+        return x
+    if isinstance(x, date):
+        return datetime(x.year, x.month, x.day)
+    import pandas as pd
+    return pd.to_datetime(x).to_pydatetime()
+
 def _span_dict(start_dt, end_dt):
     if not start_dt or not end_dt:
         return None
-    start = pd.to_datetime(start_dt)
-    end = pd.to_datetime(end_dt)
+    start = _to_dt(start_dt)
+    end = _to_dt(end_dt)
     days = int((end - start).days)
     years = round(days / 365.25, 6)
     return {"start_date": start.isoformat(), "end_date": end.isoformat(), "days": days, "years": years}
@@ -560,10 +773,14 @@ def _irr_from_span(initial_value: float, current_value: float, start_dt, end_dt)
             return None
         if not start_dt or not end_dt:
             return None
-        years = max((pd.to_datetime(end_dt) - pd.to_datetime(start_dt)).days / 365.25, 0.0)
+        years = max((_to_dt(end_dt) - _to_dt(start_dt)).days / 365.25, 0.0)
         if years <= 0:
             return None
-        return (pow(float(current_value) / float(initial_value), 1.0 / years) - 1.0) * 100.0
+        ratio = float(current_value) / float(initial_value)
+        if ratio <= 0:
+            # a fully written-down position is -100%; a negative value has no real-valued rate
+            return -100.0 if ratio == 0 else None
+        return (math.exp(math.log(ratio) / years) - 1.0) * 100.0
     except Exception:
         return None
 
@@ -578,23 +795,37 @@ def _db_overview_latest(sheet: str):
         return None
     try:
         from sqlalchemy import desc
-        snap = (WorkbookSnapshot.query.filter_by(sheet=sheet)
+        # latest snapshot + its totals in one round-trip; the sums run in SQL instead of
+        # loading every InvestorBalance row
+        snap = (db.session.query(WorkbookSnapshot.id, WorkbookSnapshot.as_of)
+                .filter(WorkbookSnapshot.sheet == sheet)
                 .order_by(desc(WorkbookSnapshot.as_of), desc(WorkbookSnapshot.id))
-                .first())
-        if not snap:
+                .limit(1)
+                .subquery())
+        agg = (db.session.query(
+                    snap.c.as_of,
+                    func.count(InvestorBalance.id),
+                    func.coalesce(func.sum(InvestorBalance.current_value), 0.0),
+                    func.coalesce(func.sum(InvestorBalance.initial_value), 0.0),
+               )
+               .select_from(snap)
+               .outerjoin(InvestorBalance, InvestorBalance.snapshot_id == snap.c.id)
+               .group_by(snap.c.id, snap.c.as_of)
+               .first())
+        if not agg:
             return None
-        rows = InvestorBalance.query.filter_by(snapshot_id=snap.id).all()
-        if not rows:
+        as_of, row_count, current_total, initial_total = agg
+        if not row_count:
             return None
-        current_total = sum((r.current_value or 0.0) for r in rows)
-        initial_total = sum((r.initial_value or 0.0) for r in rows)
+        current_total = float(current_total)
+        initial_total = float(initial_total)
         moic = (current_total / initial_total) if initial_total else None
         roi_pct = ((current_total - initial_total) / initial_total * 100.0) if initial_total else None
         return {
             "source": "db",
             "sheet": sheet,
-            "latest_date": snap.as_of.isoformat(),
-            "row_count": len(rows),
+            "latest_date": as_of.isoformat(),
+            "row_count": int(row_count),
             "ending_balance_total": current_total,
             "current_value": current_total,
             "initial_value": initial_total,
@@ -610,6 +841,14 @@ def _db_overview_latest(sheet: str):
 def _resolve_investor_name_for_user(user: User | None) -> str | None:
     if not user:
         return None
+    # memoized on flask.g: at most one pair of Investor lookups per request
+    memo = g.setdefault("_investor_name_by_user", {})
+    key = (getattr(user, "id", None), getattr(user, "email", None))
+    if key not in memo:
+        memo[key] = _resolve_investor_name_uncached(user)
+    return memo[key]
+
+def _resolve_investor_name_uncached(user) -> str | None:
     try:
         inv = Investor.query.filter_by(account_user_id=user.id).order_by(Investor.updated_at.desc()).first()
         if inv and inv.name:
@@ -633,17 +872,19 @@ def _db_investor_latest(investor: str, sheet: str):
         return None
     try:
         from sqlalchemy import desc
-        snap = (WorkbookSnapshot.query.filter_by(sheet=sheet)
+        # latest snapshot for the sheet joined to the investor's row: one round-trip
+        snap = (db.session.query(WorkbookSnapshot.id, WorkbookSnapshot.as_of)
+                .filter(WorkbookSnapshot.sheet == sheet)
                 .order_by(desc(WorkbookSnapshot.as_of), desc(WorkbookSnapshot.id))
-                .first())
-        if not snap:
-            return None
-        row = (InvestorBalance.query
-               .filter_by(snapshot_id=snap.id)
+                .limit(1)
+                .subquery())
+        hit = (db.session.query(InvestorBalance, snap.c.as_of)
+               .join(snap, InvestorBalance.snapshot_id == snap.c.id)
                .filter(InvestorBalance.investor.ilike(f"%{investor}%"))
                .first())
-        if not row:
+        if not hit:
             return None
+        row, snap_as_of = hit
         start_dt = getattr(row, "initial_date", None)
         end_dt   = getattr(row, "current_date", None)
         irr = getattr(row, "irr_pct", None)
@@ -652,7 +893,7 @@ def _db_investor_latest(investor: str, sheet: str):
         return {
             "source": "db",
             "sheet": sheet,
-            "latest_date": (end_dt.isoformat() if end_dt else snap.as_of.isoformat()),
+            "latest_date": (end_dt.isoformat() if end_dt else snap_as_of.isoformat()),
             "investor": investor,
             "initial_value": row.initial_value,
             "current_value": row.current_value,
@@ -675,6 +916,9 @@ def _compute_from_values(values: list[list], sheet_name: str, basis: str = "ince
     Robust month/YTD/inception computation from Excel usedRange values.
     If no per-row date column is present, detect a single control date in header and use it.
     """
+    import numpy as np
+    import pandas as pd
+
     if not values or len(values) < 2:
         raise RuntimeError("No data returned from Excel API")
 
@@ -692,44 +936,40 @@ def _compute_from_values(values: list[list], sheet_name: str, basis: str = "ince
         raise RuntimeError("No rows beneath header")
 
     headers_norm = [_normhdr(h) for h in headers_raw]
-    df = pd.DataFrame(records, columns=headers_raw)
-
-    def _find_last_index(cands_norm: tuple[str, ...]):
-        idx = None
-        for i, h in enumerate(headers_norm):
-            if any(c in h for c in cands_norm):
-                idx = i
-        return idx
-
-    end_i  = _find_last_index(_ENDING_ALIASES_N)
-    beg_i  = _find_last_index(_BEGIN_ALIASES_N)
-    date_i = _find_last_index(_DATE_ALIASES_N)
+    n_rows = len(records)
+
+    def _col(i: int):
+        # one column at a time; the full usedRange is never materialized as an object frame
+        return pd.Series([r[i] if i < len(r) else None for r in records])
+
+    def _find_last_index(alias_re: re.Pattern):
+        # scan from the right and stop at the first hit (the last matching column)
+        for i in range(len(headers_norm) - 1, -1, -1):
+            if alias_re.search(headers_norm[i]):
+                return i
+        return None
+
+    end_i  = _find_last_index(_ENDING_ALIAS_RE)
+    beg_i  = _find_last_index(_BEGIN_ALIAS_RE)
+    date_i = _find_last_index(_DATE_ALIAS_RE)
     if end_i is None:
         raise RuntimeError("Could not find an 'Ending/Closing Balance' column")
 
-    # numeric coercion
-    def _to_num(x):
-        if x is None: return math.nan
-        if isinstance(x, (int, float)): return float(x)
-        s = str(x).strip().replace(",", "").replace("$", "")
-        if s.startswith("(") and s.endswith(")"): s = "-" + s[1:-1]
-        try: return float(s)
-        except Exception: return math.nan
-
-    df.iloc[:, end_i] = pd.to_numeric(df.iloc[:, end_i].map(_to_num), errors="coerce")
-    if beg_i is not None:
-        df.iloc[:, beg_i] = pd.to_numeric(df.iloc[:, beg_i].map(_to_num), errors="coerce")
+    # numeric coercion, once, straight to float64 arrays (Graph usually returns these
+    # columns as floats already)
+    end_vals = _coerce_money_series(_col(end_i)).to_numpy(dtype=np.float64)
+    beg_vals = _coerce_money_series(_col(beg_i)).to_numpy(dtype=np.float64) if beg_i is not None else None
 
     # 2) Dates: prefer a column; else detect a single control-date in the header
     control_date: datetime | None = None
 
     if date_i is None:
-        def _auto_date_index(frame, exclude_idx):
-            best_i, best_hits, n = None, -1, len(frame)
-            for i in range(frame.shape[1]):
+        def _auto_date_index(exclude_idx):
+            best_i, best_hits, n = None, -1, n_rows
+            for i in range(len(headers_raw)):
                 if i in exclude_idx:
                     continue
-                s = _coerce_dates_series(frame.iloc[:, i])
+                s = _coerce_dates_series(_col(i))
                 hits = int(s.notna().sum())
                 ratio = hits / max(1, n)
                 if hits >= 4 and ratio >= 0.35:
@@ -737,7 +977,7 @@ def _compute_from_values(values: list[list], sheet_name: str, basis: str = "ince
                         best_i, best_hits = i, hits
             return best_i
 
-        date_i = _auto_date_index(df, exclude_idx={end_i} | ({beg_i} if beg_i is not None else set()))
+        date_i = _auto_date_index(exclude_idx={end_i} | ({beg_i} if beg_i is not None else set()))
 
         if date_i is None:
             MAX_SCAN_R = min(40, len(values))
@@ -775,50 +1015,52 @@ def _compute_from_values(values: list[list], sheet_name: str, basis: str = "ince
                     control_date = max(found)
 
     if date_i is not None:
-        dates_series = _coerce_dates_series(df.iloc[:, date_i])
-        df["__dt"] = dates_series
+        dt_series = _coerce_dates_series(_col(date_i))
     else:
         if control_date is None:
             raise RuntimeError("No date column or control date found in the sheet header.")
-        df["__dt"] = pd.Series(pd.to_datetime([control_date] * len(df)), index=df.index)
-
-    # keep numeric/date rows
-    numeric_cols = [end_i] + ([beg_i] if beg_i is not None else [])
-    work = df[(df.iloc[:, numeric_cols].apply(lambda r: r.notna().any(), axis=1)) & (df["__dt"].notna())].copy()
-    if work.empty:
+        dt_series = pd.Series(pd.Timestamp(control_date), index=pd.RangeIndex(n_rows))
+
+    # keep numeric/date rows (boolean mask on the arrays instead of a row-wise apply)
+    has_num = ~np.isnan(end_vals)
+    if beg_vals is not None:
+        has_num |= ~np.isnan(beg_vals)
+    keep = has_num & dt_series.notna().to_numpy()
+    if not keep.any():
         raise RuntimeError("No numeric rows with valid dates found.")
 
-    work["__end"] = pd.to_numeric(work.iloc[:, end_i], errors="coerce")
-    if beg_i is not None:
-        work["__beg"] = pd.to_numeric(work.iloc[:, beg_i], errors="coerce")
+    # per-day sums on integer day ordinals (np.unique + weighted bincount) rather than a
+    # groupby keyed on Python date objects; all-NaN days sum to 0.0 as before
+    days, inv = np.unique(dt_series.to_numpy()[keep].astype("datetime64[D]"), return_inverse=True)
+    day_keys = days.astype(object).tolist()  # datetime64[D] -> datetime.date
 
-    gb = work.groupby(work["__dt"].dt.date)
-    end_by_date = gb["__end"].sum(min_count=1).fillna(0.0).to_dict()
-    beg_by_date = gb["__beg"].sum(min_count=1).fillna(0.0).to_dict() if "__beg" in work.columns else {}
+    def _sum_by_day(vals: np.ndarray) -> dict:
+        sums = np.bincount(inv, weights=np.nan_to_num(vals[keep]), minlength=len(days))
+        return dict(zip(day_keys, sums.tolist()))
+
+    end_by_date = _sum_by_day(end_vals)
+    beg_by_date = _sum_by_day(beg_vals) if beg_vals is not None else {}
 
     unique_dates = sorted(set(end_by_date.keys()) | set(beg_by_date.keys()))
     start_dt, end_dt = _bounds_for_basis([datetime.combine(d, datetime.min.time()) for d in unique_dates],
                                          basis, period_end_qs, year_qs)
     latest_iso = end_dt.date().isoformat()
 
+    by_ym = _month_index(unique_dates)
+
     def latest_in_month(dtdate: date):
-        ys, ms = dtdate.year, dtdate.month
-        c = [d for d in unique_dates if d.year == ys and d.month == ms]
-        return max(c) if c else None
+        c = by_ym.get((dtdate.year, dtdate.month))
+        return c[-1] if c else None
 
     def sum_beg_in_month(dtdate: date):
         if not beg_by_date:
             return None
-        ys, ms = dtdate.year, dtdate.month
-        c = [d for d in unique_dates if d.year == ys and d.month == ms and d in beg_by_date]
+        c = [d for d in by_ym.get((dtdate.year, dtdate.month), ()) if d in beg_by_date]
         return float(sum(beg_by_date.get(d, 0.0) for d in c)) if c else None
 
     def prev_month_latest(dtdate: date):
-        y, m = dtdate.year, dtdate.month
-        if m == 1: y, m = y - 1, 12
-        else: m -= 1
-        c = [d for d in unique_dates if d.year == y and d.month == m]
-        return max(c) if c else None
+        c = by_ym.get(_prev_ym(dtdate))
+        return c[-1] if c else None
 
     eff_basis = "month" if basis == "latest" else basis
     if eff_basis == "month":
@@ -833,26 +1075,25 @@ def _compute_from_values(values: list[list], sheet_name: str, basis: str = "ince
         else:
             pk = prev_month_latest(end_dt.date())
             if pk is None:
-                first = min(unique_dates)
+                first = unique_dates[0]
                 initial_value = float(end_by_date.get(first, 0.0))
             else:
                 initial_value = float(end_by_date.get(pk, 0.0))
     else:
         ek = latest_in_month(end_dt.date()) if eff_basis in ("ytd", "quarter") else end_dt.date()
         if ek not in end_by_date:
-            cands = [d for d in unique_dates if d <= ek]
-            ek = max(cands) if cands else unique_dates[-1]
+            ek = _last_on_or_before(unique_dates, ek) or unique_dates[-1]
         current_value = float(end_by_date.get(ek, 0.0))
 
         if beg_by_date:
-            cands = [d for d in sorted(unique_dates) if d >= start_dt.date() and d in beg_by_date]
-            if cands:
-                initial_value = float(beg_by_date.get(cands[0], 0.0))
+            first_beg = _first_on_or_after(sorted(beg_by_date), start_dt.date())
+            if first_beg is not None:
+                initial_value = float(beg_by_date.get(first_beg, 0.0))
             else:
-                prev = max([d for d in unique_dates if d < start_dt.date()], default=None)
+                prev = _last_before(unique_dates, start_dt.date())
                 initial_value = float(end_by_date.get(prev, 0.0)) if prev else 0.0
         else:
-            prev = max([d for d in unique_dates if d < ek], default=None)
+            prev = _last_before(unique_dates, ek)
             initial_value = float(end_by_date.get(prev, 0.0)) if prev else 0.0
 
     moic = roi_pct = irr_pct = None
@@ -875,258 +1116,316 @@ def _compute_from_values(values: list[list], sheet_name: str, basis: str = "ince
     }
 
 # =========================
-#   Openpyxl overview (uploads)
+#   Workbook overview (uploads)
 # =========================
+_COMMITTED_RE = re.compile(r"\bcommitted\b|\bcommitment\b")
+_ENDING_STR = "ending balance"
+
 def _fast_overview(xlsm_path: Path, sheet_name: str, basis: str = "inception",
                    period_end_qs: str | None = None, year_qs: str | None = None):
-    wb_vals = load_workbook(xlsm_path, data_only=True, read_only=True)
-    wb_forms = load_workbook(xlsm_path, data_only=False, read_only=True)
-    try:
-        # resolve sheet name
-        target_name = sheet_name
-        if target_name not in wb_vals.sheetnames:
-            # simple normalization pass
-            want = _normalize_sheet_name(target_name)
-            for s in wb_vals.sheetnames:
-                if _normalize_sheet_name(s) == want or want in _normalize_sheet_name(s):
-                    target_name = s
-                    break
-        ws_v = wb_vals[target_name]
-        ws_f = wb_forms[target_name]
-
-        # Find basic headers
-        # Reuse helpers from second version
-        asof_row, asof_col, beg_row, beg_cols, end_row, end_cols = _find_header_row_and_cols(ws_v)
-        if not end_cols:
-            raise RuntimeError("Could not find an 'Ending/Closing Balance' column.")
-        target_end_col = end_cols[-1]
-        target_beg_col = beg_cols[-1] if beg_cols else None
-
-        date_to_end, date_to_beg = {}, {}
-        if asof_col:
-            for r in range((asof_row or 1) + 1, ws_v.max_row + 1):
-                d = _parse_excel_date(ws_v.cell(row=r, column=asof_col).value)
-                if not _is_sane_date(d):
-                    continue
-                dkey = d.date()
-                ev = _to_float(ws_v.cell(row=r, column=target_end_col).value)
-                if not math.isnan(ev):
-                    date_to_end[dkey] = date_to_end.get(dkey, 0.0) + float(ev)
-                if target_beg_col:
-                    bv = _to_float(ws_v.cell(row=r, column=target_beg_col).value)
-                    if not math.isnan(bv):
-                        date_to_beg[dkey] = date_to_beg.get(dkey, 0.0) + float(bv)
-
-        if not date_to_end:
-            # Fallback: scan TOTAL row for current value & committed
-            # This mirrors the simpler approach from the other file
-            max_scan_rows = min(300, ws_v.max_row)
-            max_scan_cols = min(300, ws_v.max_column)
-            # find "Ending Balance" header row
-            ending_row = None; ending_cols = []
-            committed_row = None; committed_cols = []
-            for r in range(1, max_scan_rows + 1):
-                texts = _row_texts(ws_v, r, max_scan_cols)
-                lower = [t.lower() for t in texts]
-                eb_cols = [i + 1 for i, t in enumerate(lower) if "ending balance" in t]
-                cm_cols = [i + 1 for i, t in enumerate(lower) if re.search(r"\bcommitted\b|\bcommitment\b", t)]
-                if eb_cols and ending_row is None:
+    import numpy as np
+
+    # one pass over the sheet; every scan below reads these rows
+    target_name, rows = _read_sheet_rows(xlsm_path, sheet_name)
+
+    # Find basic headers
+    # Reuse helpers from second version
+    asof_row, asof_col, beg_row, beg_cols, end_row, end_cols = _find_header_row_and_cols(rows)
+    if not end_cols:
+        raise RuntimeError("Could not find an 'Ending/Closing Balance' column.")
+    target_end_col = end_cols[-1]
+    target_beg_col = beg_cols[-1] if beg_cols else None
+
+    date_to_end, date_to_beg = {}, {}
+    if asof_col:
+        # 0-based indices once; balances parsed as whole columns, dates per cell (memoized)
+        body = rows[(asof_row or 1):]
+        ai, ei = asof_col - 1, target_end_col - 1
+        ends = _to_float_series([row[ei] if ei < len(row) else None for row in body])
+        begs = None
+        if target_beg_col:
+            bi = target_beg_col - 1
+            begs = _to_float_series([row[bi] if bi < len(row) else None for row in body])
+        # day ordinal per row (0 = no sane date), then one weighted bincount per column;
+        # a day gets a key only when it has at least one parsed value, as before
+        hi = datetime.utcnow() + timedelta(days=31)
+        ords = np.zeros(len(body), dtype=np.int64)
+        for k, row in enumerate(body):
+            d = _parse_excel_date(row[ai] if ai < len(row) else None)
+            if d and _SANE_DATE_LO <= d <= hi:
+                ords[k] = d.toordinal()
+        dated = ords > 0
+
+        def _sum_by_day(vals: np.ndarray) -> dict:
+            m = dated & ~np.isnan(vals)
+            days, inv = np.unique(ords[m], return_inverse=True)
+            sums = np.bincount(inv, weights=vals[m], minlength=len(days))
+            return {date.fromordinal(o): v for o, v in zip(days.tolist(), sums.tolist())}
+
+        date_to_end = _sum_by_day(ends)
+        if begs is not None:
+            date_to_beg = _sum_by_day(begs)
+
+    if not date_to_end:
+        # Fallback: scan TOTAL row for current value & committed
+        # This mirrors the simpler approach from the other file
+        max_scan_cols = min(300, max((len(row) for row in rows), default=0))
+        # find "Ending Balance" header row
+        ending_row = None; ending_cols = []
+        committed_row = None; committed_cols = []
+        for r, row in enumerate(rows[:300], start=1):
+            lower = [t.lower() for t in _row_texts(row, max_scan_cols)]
+            # once a header row is found, stop testing cells for it
+            if ending_row is None:
+                eb_cols = [i + 1 for i, t in enumerate(lower) if _ENDING_STR in t]
+                if eb_cols:
                     ending_row = r; ending_cols = eb_cols
-                if cm_cols and committed_row is None:
+            if committed_row is None:
+                cm_cols = [i + 1 for i, t in enumerate(lower) if _COMMITTED_RE.search(t)]
+                if cm_cols:
                     committed_row = r; committed_cols = cm_cols
-                if ending_row and committed_row:
-                    break
-
-            if not ending_row or not ending_cols:
-                raise RuntimeError("No dates nor basic headers found.")
-            target_ending_col = ending_cols[-1]
+            if ending_row and committed_row:
+                break
 
-            total_row = _scan_total_row_uploads(ws_v, start_row=ending_row + 1, label_cols=12)
-            if total_row:
-                cv = _to_float(ws_v.cell(row=total_row, column=target_ending_col).value)
-                current_value = float(0 if math.isnan(cv) else cv)
-            else:
-                current_value = _sum_contiguous_block_uploads(ws_v, start_row=ending_row + 1, col=target_ending_col)
+        if not ending_row or not ending_cols:
+            raise RuntimeError("No dates nor basic headers found.")
+        target_ending_col = ending_cols[-1]
 
-            initial_value = None
-            if committed_row and committed_cols:
-                cm_total_row = _scan_total_row_uploads(ws_v, start_row=committed_row + 1, label_cols=12)
-                if cm_total_row:
-                    acc = _to_float(ws_v.cell(row=cm_total_row, column=committed_cols[-1]).value)
-                    if not math.isnan(acc):
-                        initial_value = float(acc)
-            if initial_value is None:
-                # heuristic: best committed figure
-                best = math.nan
-                if committed_row and committed_cols:
-                    for rr in range(committed_row + 1, min(ws_v.max_row, committed_row + 1000) + 1):
-                        v = _to_float(ws_v.cell(row=rr, column=committed_cols[-1]).value)
-                        if not math.isnan(v) and (math.isnan(best) or v > best):
-                            best = v
-                    if not math.isnan(best):
-                        initial_value = float(best)
-
-            moic = roi_pct = None
-            if initial_value:
-                moic = float(current_value) / float(initial_value)
-                roi_pct = (moic - 1.0) * 100.0
-
-            return {
-                "initial_value": float(initial_value) if initial_value is not None else None,
-                "current_value": float(current_value),
-                "moic": moic,
-                "roi_pct": roi_pct,
-                "irr_pct": None,
-                "time_span": None,
-                "header": {"latest_date": None},
-                "excel": {"ending": {"col_letter": get_column_letter(target_ending_col)}},
-                "file": str(xlsm_path),
-                "sheet": target_name,
-                "basis": basis,
-                "period_end": None,
-            }
-
-        # With date_to_* maps available, reuse basis computation
-        all_dates = sorted(set(date_to_end.keys()) | set(date_to_beg.keys()))
-        all_dt = [datetime.combine(d, datetime.min.time()) for d in all_dates]
-        start_dt, end_dt = _bounds_for_basis(all_dt, basis, period_end_qs, year_qs)
-        latest_iso = end_dt.date().isoformat()
-
-        def _latest_in_month(dtdate):
-            ys, ms = dtdate.year, dtdate.month
-            cands = [d for d in all_dates if d.year == ys and d.month == ms]
-            return max(cands) if cands else None
-
-        def _sum_beg_in_month(dtdate):
-            ys, ms = dtdate.year, dtdate.month
-            cands = [d for d in all_dates if d.year == ys and d.month == ms and d in date_to_beg]
-            return float(sum(date_to_beg.get(d, 0.0) for d in cands)) if cands else None
-
-        def _prev_month_latest(dtdate):
-            y, m = dtdate.year, dtdate.month
-            if m == 1: y, m = y - 1, 12
-            else: m -= 1
-            cands = [d for d in all_dates if d.year == y and d.month == m]
-            return max(cands) if cands else None
-
-        eff_basis = "month" if basis == "latest" else basis
-        if eff_basis == "month":
-            ek = _latest_in_month(end_dt.date())
-            if ek is None:
-                raise RuntimeError("No data for selected month.")
-            current_value = float(date_to_end.get(ek, 0.0))
-            month_beg_total = _sum_beg_in_month(end_dt.date()) if target_beg_col else None
-            if month_beg_total is not None:
-                initial_value = month_beg_total
-            else:
-                prev_key = _prev_month_latest(end_dt.date())
-                if prev_key is None:
-                    first = min(all_dates)
-                    initial_value = float(date_to_end.get(first, 0.0))
-                else:
-                    initial_value = float(date_to_end.get(prev_key, 0.0))
+        total_row = _scan_total_row_uploads(rows, start_row=ending_row + 1, label_cols=12)
+        if total_row:
+            cv = _to_float(_at(rows[total_row - 1], target_ending_col))
+            current_value = float(0 if math.isnan(cv) else cv)
         else:
-            ek = _latest_in_month(end_dt.date()) if eff_basis in ("ytd", "quarter") else end_dt.date()
-            if ek not in date_to_end:
-                cands = [d for d in all_dates if d <= ek]
-                ek = max(cands) if cands else all_dates[-1]
-            current_value = float(date_to_end.get(ek, 0.0))
-            if target_beg_col:
-                start_key = min([d for d in all_dates if d >= start_dt.date() and d in date_to_beg], default=None)
-                if start_key:
-                    initial_value = float(date_to_beg.get(start_key, 0.0))
-                else:
-                    prev_key = max([d for d in all_dates if d < start_dt.date()], default=None)
-                    initial_value = float(date_to_end.get(prev_key, 0.0)) if prev_key else 0.0
-            else:
-                prev = max([d for d in all_dates if d < ek], default=None)
-                initial_value = float(date_to_end.get(prev, 0.0)) if prev else 0.0
-
-        moic = roi_pct = irr_pct = None
-        if initial_value and initial_value != 0:
+            current_value = _sum_contiguous_block_uploads(rows, start_row=ending_row + 1, col=target_ending_col)
+
+        initial_value = None
+        if committed_row and committed_cols:
+            cm_total_row = _scan_total_row_uploads(rows, start_row=committed_row + 1, label_cols=12)
+            if cm_total_row:
+                acc = _to_float(_at(rows[cm_total_row - 1], committed_cols[-1]))
+                if not math.isnan(acc):
+                    initial_value = float(acc)
+        if initial_value is None:
+            # heuristic: best committed figure
+            if committed_row and committed_cols:
+                cc = committed_cols[-1]
+                vals = _to_float_series([_at(row, cc) for row in rows[committed_row:committed_row + 1000]])
+                vals = vals[~np.isnan(vals)]
+                if vals.size:
+                    initial_value = float(vals.max())
+
+        moic = roi_pct = None
+        if initial_value:
             moic = float(current_value) / float(initial_value)
             roi_pct = (moic - 1.0) * 100.0
-            irr_pct = _irr_from_span(initial_value, current_value, start_dt, end_dt)
 
         return {
-            "basis": eff_basis,
-            "period_end": latest_iso,
-            "initial_value": float(initial_value),
+            "initial_value": float(initial_value) if initial_value is not None else None,
             "current_value": float(current_value),
             "moic": moic,
             "roi_pct": roi_pct,
-            "irr_pct": irr_pct,
-            "time_span": _span_dict(start_dt, end_dt),
+            "irr_pct": None,
+            "time_span": None,
+            "header": {"latest_date": None},
+            "excel": {"ending": {"col_letter": _col_letter(target_ending_col)}},
             "file": str(xlsm_path),
             "sheet": target_name,
+            "basis": basis,
+            "period_end": None,
         }
-    finally:
-        try: wb_vals.close()
-        except Exception: pass
-        try: wb_forms.close()
-        except Exception: pass
+
+    # With date_to_* maps available, reuse basis computation
+    all_dates = sorted(set(date_to_end.keys()) | set(date_to_beg.keys()))
+    all_dt = [datetime.combine(d, datetime.min.time()) for d in all_dates]
+    start_dt, end_dt = _bounds_for_basis(all_dt, basis, period_end_qs, year_qs)
+    latest_iso = end_dt.date().isoformat()
+
+    by_ym = _month_index(all_dates)
+
+    def _latest_in_month(dtdate):
+        cands = by_ym.get((dtdate.year, dtdate.month))
+        return cands[-1] if cands else None
+
+    def _sum_beg_in_month(dtdate):
+        cands = [d for d in by_ym.get((dtdate.year, dtdate.month), ()) if d in date_to_beg]
+        return float(sum(date_to_beg.get(d, 0.0) for d in cands)) if cands else None
+
+    def _prev_month_latest(dtdate):
+        cands = by_ym.get(_prev_ym(dtdate))
+        return cands[-1] if cands else None
+
+    eff_basis = "month" if basis == "latest" else basis
+    if eff_basis == "month":
+        ek = _latest_in_month(end_dt.date())
+        if ek is None:
+            raise RuntimeError("No data for selected month.")
+        current_value = float(date_to_end.get(ek, 0.0))
+        month_beg_total = _sum_beg_in_month(end_dt.date()) if target_beg_col else None
+        if month_beg_total is not None:
+            initial_value = month_beg_total
+        else:
+            prev_key = _prev_month_latest(end_dt.date())
+            if prev_key is None:
+                first = all_dates[0]
+                initial_value = float(date_to_end.get(first, 0.0))
+            else:
+                initial_value = float(date_to_end.get(prev_key, 0.0))
+    else:
+        ek = _latest_in_month(end_dt.date()) if eff_basis in ("ytd", "quarter") else end_dt.date()
+        if ek not in date_to_end:
+            ek = _last_on_or_before(all_dates, ek) or all_dates[-1]
+        current_value = float(date_to_end.get(ek, 0.0))
+        if target_beg_col:
+            start_key = _first_on_or_after(sorted(date_to_beg), start_dt.date())
+            if start_key:
+                initial_value = float(date_to_beg.get(start_key, 0.0))
+            else:
+                prev_key = _last_before(all_dates, start_dt.date())
+                initial_value = float(date_to_end.get(prev_key, 0.0)) if prev_key else 0.0
+        else:
+            prev = _last_before(all_dates, ek)
+            initial_value = float(date_to_end.get(prev, 0.0)) if prev else 0.0
+
+    moic = roi_pct = irr_pct = None
+    if initial_value and initial_value != 0:
+        moic = float(current_value) / float(initial_value)
+        roi_pct = (moic - 1.0) * 100.0
+        irr_pct = _irr_from_span(initial_value, current_value, start_dt, end_dt)
+
+    return {
+        "basis": eff_basis,
+        "period_end": latest_iso,
+        "initial_value": float(initial_value),
+        "current_value": float(current_value),
+        "moic": moic,
+        "roi_pct": roi_pct,
+        "irr_pct": irr_pct,
+        "time_span": _span_dict(start_dt, end_dt),
+        "file": str(xlsm_path),
+        "sheet": target_name,
+    }
 
 def _overview_cached(xlsm_path: Path, sheet: str, basis: str, period_end_iso: str | None, year_qs: str | None):
+    """
+    `_fast_overview` memoized per (file, sheet, query). The file's mtime is re-checked at
+    most every _OVERVIEW_STAT_TTL seconds, so repeat hits skip the stat() call.
+    """
     key = (str(xlsm_path), sheet, basis.lower(), period_end_iso or "", year_qs or "")
-    mtime = os.path.getmtime(xlsm_path)
+    now = time.monotonic()
     entry = _OVERVIEW_CACHE.get(key)
-    if entry and entry["mtime"] == mtime:
-        return entry["data"]
+    if entry and now - entry[0] < _OVERVIEW_STAT_TTL:
+        return entry[2]
+    mtime = os.path.getmtime(xlsm_path)
+    if entry and entry[1] == mtime:
+        with _OVERVIEW_CACHE_LOCK:
+            _OVERVIEW_CACHE[key] = (now, mtime, entry[2])
+        return entry[2]
     data = _fast_overview(xlsm_path, sheet, basis=basis, period_end_qs=period_end_iso, year_qs=year_qs)
-    _OVERVIEW_CACHE[key] = {"mtime": mtime, "ts": time.time(), "data": data}
+    with _OVERVIEW_CACHE_LOCK:
+        if len(_OVERVIEW_CACHE) >= _OVERVIEW_CACHE_MAX:
+            for k in [k for k, (ts, _, _) in _OVERVIEW_CACHE.items() if now - ts >= _OVERVIEW_CACHE_TTL]:
+                del _OVERVIEW_CACHE[k]
+            if len(_OVERVIEW_CACHE) >= _OVERVIEW_CACHE_MAX:
+                _OVERVIEW_CACHE.clear()
+        _OVERVIEW_CACHE[key] = (now, mtime, data)
+    return data
+
+def _compute_cached(values: list[list], sheet: str, basis: str, period_end_iso: str | None, year_qs: str | None):
+    """
+    `_compute_from_values` memoized on a digest of the usedRange payload, so an unchanged
+    SharePoint sheet isn't re-parsed on every /overview hit. Entries live for 60s.
+    """
+    digest = hashlib.blake2b(repr(values).encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    key = (sheet, digest, basis.lower(), period_end_iso or "", year_qs or "")
+    now = time.monotonic()
+    with _COMPUTE_CACHE_LOCK:
+        entry = _COMPUTE_CACHE.get(key)
+        if entry and now - entry[0] < _COMPUTE_CACHE_TTL:
+            return entry[1]
+    data = _compute_from_values(values, sheet, basis=basis, period_end_qs=period_end_iso, year_qs=year_qs)
+    with _COMPUTE_CACHE_LOCK:
+        if len(_COMPUTE_CACHE) >= _COMPUTE_CACHE_MAX:
+            for k in [k for k, (ts, _) in _COMPUTE_CACHE.items() if now - ts >= _COMPUTE_CACHE_TTL]:
+                del _COMPUTE_CACHE[k]
+            if len(_COMPUTE_CACHE) >= _COMPUTE_CACHE_MAX:
+                _COMPUTE_CACHE.clear()
+        _COMPUTE_CACHE[key] = (now, data)
     return data
 
 # =========================
 #   Persist-on-read (DB)
 # =========================
+def _dialect_insert():
+    name = (db.engine.name or "").lower()
+    return pg_insert if "postgre" in name else sqlite_insert
+
+def _build_upsert_params(sheet_name: str, data: dict):
+    """
+    Row for PortfolioPeriodMetric from an overview payload, or None when it has no
+    period_end / values to persist.
+    """
+    pe = str(data.get("period_end") or "").strip()
+    if not pe:
+        return None
+    # Accept YYYY-MM or YYYY-MM-DD
+    if len(pe) == 7 and pe[4] == "-":
+        y, m = int(pe[:4]), int(pe[5:7])
+        if m == 12: d = 31
+        else:
+            from calendar import monthrange
+            d = monthrange(y, m)[1]
+        as_of = date(y, m, d)
+    else:
+        as_of = datetime.fromisoformat(pe).date()
+
+    init_v = data.get("initial_value")
+    end_v  = data.get("current_value")
+    if init_v is None or end_v is None:
+        return None
+
+    return dict(
+        sheet=sheet_name,
+        as_of_date=as_of,
+        beginning_balance=float(init_v),
+        ending_balance=float(end_v),
+        unrealized_gain_loss=data.get("unrealized_gain_loss"),
+        realized_gain_loss=data.get("realized_gain_loss"),
+        management_fees=data.get("management_fees"),
+        source=data.get("source") or "overview",
+    )
+
+def _flush_period_metrics(params_list: list[dict], update_source: bool = True):
+    """
+    Upsert all rows with one multi-row INSERT ... ON CONFLICT and a single commit.
+    update_source=False keeps the existing row's `source` on conflict.
+    """
+    if not params_list:
+        return
+    # one row per (sheet, as_of_date): ON CONFLICT can't touch the same row twice in a statement
+    rows = list({(p["sheet"], p["as_of_date"]): p for p in params_list}.values())
+    stmt = _dialect_insert()(PortfolioPeriodMetric).values(rows)
+    set_ = {
+        "beginning_balance": stmt.excluded.beginning_balance,
+        "ending_balance": stmt.excluded.ending_balance,
+        "unrealized_gain_loss": stmt.excluded.unrealized_gain_loss,
+        "realized_gain_loss": stmt.excluded.realized_gain_loss,
+        "management_fees": stmt.excluded.management_fees,
+        "updated_at": datetime.utcnow(),
+    }
+    if update_source:
+        set_["source"] = stmt.excluded.source
+    stmt = stmt.on_conflict_do_update(index_elements=["sheet", "as_of_date"], set_=set_)
+    db.session.execute(stmt)
+    db.session.commit()
+
 def _upsert_period_metric(sheet_name: str, data: dict):
     """
     Persist the latest computed month totals whenever overview runs.
     """
     try:
-        pe = str(data.get("period_end") or "").strip()
-        if not pe:
-            return
-        # Accept YYYY-MM or YYYY-MM-DD
-        if len(pe) == 7 and pe[4] == "-":
-            y, m = int(pe[:4]), int(pe[5:7])
-            if m == 12: d = 31
-            else:
-                from calendar import monthrange
-                d = monthrange(y, m)[1]
-            as_of = date(y, m, d)
-        else:
-            as_of = datetime.fromisoformat(pe).date()
-
-        init_v = data.get("initial_value")
-        end_v  = data.get("current_value")
-        if init_v is None or end_v is None:
-            return
-
-        stmt = sqlite_insert(PortfolioPeriodMetric).values(
-            sheet=sheet_name,
-            as_of_date=as_of,
-            beginning_balance=float(init_v),
-            ending_balance=float(end_v),
-            unrealized_gain_loss=data.get("unrealized_gain_loss"),
-            realized_gain_loss=data.get("realized_gain_loss"),
-            management_fees=data.get("management_fees"),
-            source=data.get("source") or "overview",
-        )
-        stmt = stmt.on_conflict_do_update(
-            index_elements=["sheet", "as_of_date"],
-            set_={
-                "beginning_balance": stmt.excluded.beginning_balance,
-                "ending_balance": stmt.excluded.ending_balance,
-                "unrealized_gain_loss": stmt.excluded.unrealized_gain_loss,
-                "realized_gain_loss": stmt.excluded.realized_gain_loss,
-                "management_fees": stmt.excluded.management_fees,
-                "updated_at": datetime.utcnow(),
-                "source": stmt.excluded.source,
-            },
-        )
-        db.session.execute(stmt)
-        db.session.commit()
+        params = _build_upsert_params(sheet_name, data)
+        if params is not None:
+            _flush_period_metrics([params])
     except Exception as e:
         current_app.logger.exception("overview upsert failed: %s", e)
         db.session.rollback()
@@ -1153,6 +1452,12 @@ class SimpleUser:
                 self.last_name = ""
 
 def _current_user():
+    # resolved once per request; g is torn down with the app context
+    if "_metrics_user" not in g:
+        g._metrics_user = _current_user_uncached()
+    return g._metrics_user
+
+def _current_user_uncached():
     uid = _current_user_id()
     if uid:
         try:
@@ -1446,7 +1751,7 @@ def overview():
         finally:
             close_session(drive_id, item_id, bearer, sid)
 
-        data = _compute_from_values(values, sheet, basis=basis, period_end_qs=period_end_iso, year_qs=year_qs)
+        data = _compute_cached(values, sheet, basis, period_end_iso, year_qs)
         _upsert_period_metric(sheet, data)
         resp = jsonify(data); resp.headers["Cache-Control"] = "no-store"
         return resp
@@ -1679,9 +1984,11 @@ def list_files():
 #   API: Ingestion (SharePoint → DB monthly)
 # =========================
 import regex as _re
+_CLEAN_WS_RE = _re.compile(r"\s+")
+
 def _clean_txt(x: str) -> str:
     s = (x or "").replace("\u00a0", " ").replace("\u2011", "-")
-    return _re.sub(r"\s+", " ", s).strip().lower()
+    return _CLEAN_WS_RE.sub(" ", s).strip().lower()
 
 _LABEL_ALIASES = {
     "Beginning Balance": [
@@ -1723,9 +2030,10 @@ _METRIC_KEYS = {
     "Realized Gain/Loss": "realized",
     "Management Fees": "fees",
 }
+_LABEL_PATTERNS = {name: [_re.compile(pat, _re.I) for pat in pats] for name, pats in _LABEL_ALIASES.items()}
 
 def _find_label_row(values, canonical_label, search_rows=200):
-    patterns = [_re.compile(pat, _re.I) for pat in _LABEL_ALIASES.get(canonical_label, [canonical_label])]
+    patterns = _LABEL_PATTERNS.get(canonical_label) or [_re.compile(canonical_label, _re.I)]
     for r_idx, row in enumerate(values[:search_rows], start=1):
         for cell in row:
             txt = _clean_txt(str(cell))
@@ -1794,13 +2102,13 @@ def _find_header_row_and_date_columns(values, max_scan_rows=120, anchor_row=None
     return candidates[0]
 
 def _metric_for_column(values, header_row_1b: int, col_1b: int, lookback_rows: int = 10):
-    compiled = {name: [_re.compile(pat, _re.I) for pat in pats] for name, pats in _LABEL_ALIASES.items()}
+    compiled = _LABEL_PATTERNS
     r = header_row_1b
     while r >= 1 and r >= header_row_1b - lookback_rows:
         row = values[r - 1] if r - 1 < len(values) else []
         cell = row[col_1b - 1] if col_1b - 1 < len(row) else None
         txt = ("" if cell is None else str(cell)).replace("\u00a0", " ").strip().lower()
-        txt_norm = _re.sub(r"\s+", " ", txt)
+        txt_norm = _CLEAN_WS_RE.sub(" ", txt)
         for canonical, patterns in compiled.items():
             if any(p.fullmatch(txt_norm) for p in patterns):
                 return _METRIC_KEYS.get(canonical)
@@ -1919,10 +2227,9 @@ def ingest_from_sheet():
                 if prevs:
                     totals_by_date[dt_key]["beginning"] = totals_by_date[max(prevs)]["ending"]
 
-        # 5) Upsert rows
-        upserted = []
-        for dt_key, rec in sorted(totals_by_date.items()):
-            stmt = sqlite_insert(PortfolioPeriodMetric).values(
+        # 5) Upsert rows (one statement, one commit)
+        params_list = [
+            dict(
                 sheet=sheet,
                 as_of_date=dt_key,
                 beginning_balance=rec["beginning"],
@@ -1932,20 +2239,10 @@ def ingest_from_sheet():
                 management_fees=rec["fees"],
                 source="sharepoint-live",
             )
-            stmt = stmt.on_conflict_do_update(
-                index_elements=["sheet", "as_of_date"],
-                set_={
-                    "beginning_balance": stmt.excluded.beginning_balance,
-                    "ending_balance": stmt.excluded.ending_balance,
-                    "unrealized_gain_loss": stmt.excluded.unrealized_gain_loss,
-                    "realized_gain_loss": stmt.excluded.realized_gain_loss,
-                    "management_fees": stmt.excluded.management_fees,
-                    "updated_at": datetime.utcnow(),
-                },
-            )
-            db.session.execute(stmt)
-            upserted.append(dt_key.isoformat())
-        db.session.commit()
+            for dt_key, rec in sorted(totals_by_date.items())
+        ]
+        _flush_period_metrics(params_list, update_source=False)
+        upserted = [p["as_of_date"].isoformat() for p in params_list]
 
         return jsonify(ok=True, sheet=sheet, upserted=upserted)
     except Exception as e:
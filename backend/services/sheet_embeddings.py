@@ -319,11 +319,25 @@ def build_or_load_index(tenant: Optional[str]) -> Dict[str, Any]:
     p = _paths(tenant)
     return {"tenant": tenant, "paths": p}
 
+# Loaded FAISS indexes keyed by path -> {"fp": (mtime_ns, size), "index": ...}.
+# Every writer replaces faiss.index on disk, which changes the fingerprint.
+_INDEX_CACHE: Dict[str, Dict[str, Any]] = {}
+
 def _load_index_handle(index_handle: Dict[str, Any]):
     import faiss  # type: ignore
     p = index_handle["paths"]
-    if not os.path.exists(p["index"]): return None
-    return faiss.read_index(p["index"])
+    try:
+        st = os.stat(p["index"])
+    except OSError:
+        _INDEX_CACHE.pop(p["index"], None)
+        return None
+    fp = (st.st_mtime_ns, st.st_size)
+    entry = _INDEX_CACHE.get(p["index"])
+    if entry and entry["fp"] == fp:
+        return entry["index"]
+    index = faiss.read_index(p["index"])
+    _INDEX_CACHE[p["index"]] = {"fp": fp, "index": index}
+    return index
 
 # ======================= BM25 (tiny) ==========================
 def _build_bm25_cache(p_meta: str, p_cache: str) -> None:
@@ -0,0 +1,34 @@
+# orjson-backed provider for app.json (jsonify / request.get_json app-wide)
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    app.json provider using orjson for dumps/loads. Datetimes, Decimals, UUIDs and
+    dataclasses are passed through to Flask's own `default`, so responses keep the
+    exact shapes jsonify produced before (HTTP dates, Decimal as str).
+    """
+
+    _OPTS = 0
+    if orjson is not None:
+        _OPTS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        opts = self._OPTS | (orjson.OPT_SORT_KEYS if kwargs.get("sort_keys", self.sort_keys) else 0)
+        try:
+            return orjson.dumps(obj, default=self.default, option=opts).decode()
+        except TypeError:
+            # orjson is stricter (e.g. >64-bit ints); the stdlib path keeps old behaviour
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # e.g. NaN/Infinity literals, which the stdlib decoder accepts
+            return super().loads(s, **kwargs)
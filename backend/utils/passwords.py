@@ -0,0 +1,63 @@
+# Password hashing: argon2id via passlib, bcrypt when argon2 is unavailable, and werkzeug
+# hashes still accepted for legacy rows
+from werkzeug.security import check_password_hash, generate_password_hash
+
+try:
+    from passlib.context import CryptContext  # type: ignore
+    # OWASP argon2id baseline: 46 MiB, t=1, p=1 (argon2-cffi -> libargon2)
+    pwd_ctx = CryptContext(
+        schemes=["argon2"],
+        argon2__type="ID",
+        argon2__memory_cost=46 * 1024,
+        argon2__time_cost=1,
+        argon2__parallelism=1,
+    )
+    if not pwd_ctx.handler("argon2").has_backend():  # argon2-cffi not installed
+        raise ImportError("argon2 backend unavailable")
+except Exception:  # pragma: no cover
+    pwd_ctx = None
+
+try:
+    import bcrypt  # type: ignore
+except Exception:  # pragma: no cover
+    bcrypt = None
+
+BCRYPT_ROUNDS = 12
+_BCRYPT_PREFIXES = ("$2b$", "$2a$", "$2y$")
+
+
+def hash_password(plain: str) -> str:
+    """argon2id when available, else bcrypt (cost 12), else werkzeug's default."""
+    if pwd_ctx is not None:
+        return pwd_ctx.hash(plain)
+    if bcrypt is not None:
+        return bcrypt.hashpw(plain.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode("ascii")
+    return generate_password_hash(plain)
+
+
+def _is_current(stored: str) -> bool:
+    """True when `stored` was made by the scheme/parameters hash_password would use now."""
+    if pwd_ctx is not None:
+        return stored.startswith("$argon2") and not pwd_ctx.needs_update(stored)
+    if bcrypt is not None:
+        return stored.startswith(_BCRYPT_PREFIXES) and stored[4:6] == f"{BCRYPT_ROUNDS:02d}"
+    return not stored.startswith(("$argon2",) + _BCRYPT_PREFIXES)
+
+
+def verify_password(stored: str, plain: str):
+    """
+    Returns (ok, new_hash). `new_hash` is set when the stored value should be replaced:
+    legacy werkzeug PBKDF2/scrypt entries, bcrypt once argon2 is available, or hashes
+    made with older parameters.
+    """
+    if not stored:
+        return False, None
+    if stored.startswith("$argon2"):
+        ok = pwd_ctx is not None and pwd_ctx.verify(plain, stored)
+    elif stored.startswith(_BCRYPT_PREFIXES):
+        ok = bcrypt is not None and bcrypt.checkpw(plain.encode("utf-8"), stored.encode("ascii"))
+    else:
+        ok = check_password_hash(stored, plain)
+    if not ok:
+        return False, None
+    return True, (None if _is_current(stored) else hash_password(plain))